@@ -0,0 +1,60 @@
+"""
+Hashing throughput benchmark
+
+Writes a synthetic file and reports the throughput (MB/s) of golink.hashing.hash_file
+for each algorithm set and buffer size.
+
+Usage: python benchmarks/hashing.py --size 4 --algorithms md5 sha256 md5,sha256,blake2b
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from golink.hashing import hash_file  # noqa: E402
+
+
+def write_synthetic_file(path, size):
+    block = os.urandom(16 * 1024 * 1024)
+    written = 0
+    with open(path, "wb") as f:
+        while written < size:
+            data = block[:size - written]
+            f.write(data)
+            written += len(data)
+
+
+def run(path, algorithms, buffer_size):
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    hash_file(path, algorithms=algorithms, buffer_size=buffer_size)
+    elapsed = time.perf_counter() - start
+    return size / elapsed / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark golink file hashing")
+    parser.add_argument("--size", type=float, default=2, help="Size of the synthetic file, in GiB")
+    parser.add_argument("--algorithms", nargs="+", default=["md5", "sha256", "blake2b", "md5,sha256"], help="Algorithm sets to test (comma separated for a single pass over several algorithms)")
+    parser.add_argument("--buffer-sizes", nargs="+", type=int, default=[8192, 1024 * 1024, 8 * 1024 * 1024, 64 * 1024 * 1024], help="Buffer sizes to test, in bytes")
+    parser.add_argument("--file", help="Use an existing file instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.file
+        if not path:
+            path = os.path.join(tmp_dir, "synthetic.bin")
+            write_synthetic_file(path, int(args.size * 1024 * 1024 * 1024))
+
+        print("%-25s %12s %10s" % ("algorithms", "buffer", "MB/s"))
+        for algorithms in args.algorithms:
+            for buffer_size in args.buffer_sizes:
+                rate = run(path, algorithms.split(","), buffer_size)
+                print("%-25s %12d %10.1f" % (algorithms, buffer_size, rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Repository lookup benchmark
+
+Compares golink.model.repos.RepoIndex with a linear scan of the repositories (the previous implementation),
+to find the repository of a path and to detect overlapping repositories.
+
+Usage: python benchmarks/repos_lookup.py --repos 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from golink.model.repos import RepoIndex  # noqa: E402
+
+
+class FakeRepo():
+
+    def __init__(self, local_path):
+        self.local_path = local_path
+
+
+def repo_paths(number, seed=0):
+    rng = random.Random(seed)
+    paths = set()
+    while len(paths) < number:
+        paths.add("/groups/%s/project_%s/%s" % (rng.choice(["genomics", "proteomics", "imaging", "users"]), rng.randint(0, number * 10), rng.choice(["public", "shared", "data"])))
+    return sorted(paths)
+
+
+def linear_overlaps(paths):
+    known = []
+    for path in paths:
+        for other in known:
+            if os.path.join(path, "").startswith(os.path.join(other, "")) or os.path.join(other, "").startswith(os.path.join(path, "")):
+                raise ValueError(path)
+        known.append(path)
+    return known
+
+
+def linear_find(paths, path):
+    path = os.path.join(path, "")
+    for repo in paths:
+        if path.startswith(os.path.join(repo, "")):
+            return repo
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark golink repository lookups")
+    parser.add_argument("--repos", type=int, default=10000, help="Number of repositories")
+    parser.add_argument("--lookups", type=int, default=10000, help="Number of lookups")
+    args = parser.parse_args()
+
+    paths = repo_paths(args.repos)
+    rng = random.Random(1)
+    lookups = [rng.choice(paths) + "/some/sub/dir/file_%s.txt" % i for i in range(args.lookups)]
+
+    start = time.perf_counter()
+    index = RepoIndex()
+    for path in paths:
+        index.add(FakeRepo(path))
+    print("RepoIndex: loaded %s repositories in %.1f ms" % (args.repos, (time.perf_counter() - start) * 1000))
+
+    start = time.perf_counter()
+    for path in lookups:
+        index.find(path)
+    print("RepoIndex: %.2f us/lookup" % ((time.perf_counter() - start) / args.lookups * 1000000))
+
+    # The quadratic overlap check is only run on a subset
+    subset = paths[:min(args.repos, 2000)]
+    start = time.perf_counter()
+    linear_overlaps(subset)
+    print("Linear scan: checked overlaps of %s repositories in %.1f ms" % (len(subset), (time.perf_counter() - start) * 1000))
+
+    linear_lookups = lookups[:1000]
+    start = time.perf_counter()
+    for path in linear_lookups:
+        linear_find(paths, path)
+    print("Linear scan: %.2f us/lookup" % ((time.perf_counter() - start) / len(linear_lookups) * 1000000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Startup benchmark
+
+Creates the golink app several times, and reports the mean duration of each phase of create_app
+(see app.startup_timings). External services (LDAP, Baricadr) are checked in the background and do not
+appear in the startup time.
+
+Usage: GOLINK_REPOS_CONF=test-data/sample_repos.yml SECRET_KEY=xxx python benchmarks/startup.py --mode test
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark golink startup")
+    parser.add_argument("--mode", default="test", choices=["dev", "test", "prod"], help="Run mode")
+    parser.add_argument("--runs", type=int, default=10, help="Number of apps to create")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    from golink.app import create_app
+    print("Import of golink.app: %.1f ms" % ((time.perf_counter() - start) * 1000))
+
+    totals = {}
+    start = time.perf_counter()
+    for i in range(args.runs):
+        app = create_app(run_mode=args.mode)
+        for phase, duration in app.startup_timings.items():
+            totals[phase] = totals.get(phase, 0) + duration
+    elapsed = time.perf_counter() - start
+
+    print("%-15s %10s" % ("phase", "ms"))
+    for phase, duration in totals.items():
+        print("%-15s %10.2f" % (phase, duration / args.runs * 1000))
+    print("%-15s %10.2f" % ("total", elapsed / args.runs * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Tag suggestion benchmark
+
+Builds a golink.tag_index.TagIndex of random tags, and reports the build time and the
+mean latency of suggestions for prefixes of each length.
+
+Usage: python benchmarks/tag_suggest.py --tags 100000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from golink.tag_index import TagIndex  # noqa: E402
+
+
+def random_tags(number, seed=0):
+    rng = random.Random(seed)
+    counts = {}
+    while len(counts) < number:
+        name = "".join(rng.choice(string.ascii_lowercase + "_") for i in range(rng.randint(3, 15)))
+        # Few very used tags, many rarely used ones
+        counts[name] = int(rng.paretovariate(1.2))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark golink tag suggestions")
+    parser.add_argument("--tags", type=int, default=100000, help="Number of tags in the index")
+    parser.add_argument("--queries", type=int, default=10000, help="Number of suggestions per prefix length")
+    parser.add_argument("--limit", type=int, default=10, help="Number of suggestions per query")
+    args = parser.parse_args()
+
+    counts = random_tags(args.tags)
+    names = list(counts)
+    index = TagIndex()
+
+    start = time.perf_counter()
+    index.build(counts)
+    print("Index of %s tags built in %.1f ms" % (args.tags, (time.perf_counter() - start) * 1000))
+
+    rng = random.Random(1)
+    print("%-15s %12s" % ("prefix length", "us/query"))
+    for length in range(0, 7):
+        prefixes = [rng.choice(names)[:length] for i in range(args.queries)]
+        start = time.perf_counter()
+        for prefix in prefixes:
+            index.suggest(prefix, args.limit)
+        elapsed = time.perf_counter() - start
+        print("%-15d %12.1f" % (length, elapsed / args.queries * 1000000))
+
+    start = time.perf_counter()
+    for name in rng.sample(names, 1000):
+        index.update({name: 1})
+    print("Incremental update: %.1f us" % ((time.perf_counter() - start) / 1000 * 1000000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from flask import (Blueprint, current_app, jsonify, make_response)
+
+from golink.decorators import admin_required, token_required
+from golink.model.hash_cache import get_hash_cache_stats
+
+
+admin = Blueprint('admin', __name__, url_prefix='/')
+
+
+@admin.route('/api/admin/hash_cache', methods=['GET'])
+@token_required
+@admin_required
+def hash_cache():
+    return make_response(jsonify(get_hash_cache_stats()), 200)
+
+
+@admin.route('/api/admin/cache', methods=['GET'])
+@token_required
+@admin_required
+def response_cache():
+    return make_response(jsonify(current_app.response_cache.stats()), 200)
+
+
+@admin.route('/api/admin/health', methods=['GET'])
+@token_required
+@admin_required
+def health():
+    workers = current_app.worker_monitor.get_status()
+    data = {
+        'workers': workers['workers'],
+        'celery_available': workers['availability'] is not None,
+        'repos': current_app.repos.stats(),
+        'dependencies': {}
+    }
+    for name, probe in current_app.probes.items():
+        # Refreshed in the background if outdated
+        probe.get()
+        data['dependencies'][name] = probe.status()
+    if workers.get('error'):
+        data['error'] = workers['error']
+    return make_response(jsonify(data), 200)
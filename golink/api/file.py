@@ -1,18 +1,21 @@
 import os
+from collections import Counter
 
-from collections import defaultdict
+from flask import (Blueprint, current_app, g, jsonify, make_response, request, send_file)
 
-from email_validator import EmailNotValidError, validate_email
-
-from flask import (Blueprint, current_app, jsonify, make_response, request, session, send_file)
-
-from golink.db_models import PublishedFile, Tag
+from golink.cache import FILE_LISTINGS
+from golink.db_models import PublishedFile
 from golink.extensions import db
-from golink.utils import get_celery_worker_status, is_valid_uuid, get_or_create
+from golink.model.listing import filter_tags, get_page_tags, paginate, parse_pagination, parse_tag_filters
+from golink.model.outbox import enqueue_task
+from golink.model.search import MATCH_MODES, SORT_MODES, filter_file_name, relevance_order
+from golink.model.tags import delete_orphan_tags, get_or_create_tags
+from golink.ranges import ranges_response
+from golink.utils import EmailNotValidError, is_valid_uuid, validate_email
 
-from golink.decorators import token_required, admin_required, is_valid_uid
+from golink.decorators import cached_response, token_required, admin_required, is_valid_uid
 
-from sqlalchemy import desc, func
+from werkzeug.http import is_resource_modified
 
 
 file = Blueprint('file', __name__, url_prefix='/')
@@ -36,43 +39,26 @@ def endpoints():
 
 
 @file.route('/api/list', methods=['GET'])
+@cached_response("list")
 def list_files():
 
-    offset = request.args.get('offset', 0)
-
     try:
-        offset = int(offset)
-    except ValueError:
-        offset = 0
-
-    limit = request.args.get('limit', 10)
+        pagination = parse_pagination(request.args)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
 
-    try:
-        limit = int(limit)
-    except ValueError:
-        limit = 0
+    files = PublishedFile().query.filter(PublishedFile.status != "unpublished")
+    files = filter_tags(files, **parse_tag_filters(request.args))
+    files, next_cursor, total = paginate(files, **pagination)
 
-    tags = request.args.getlist("tags") or request.args.getlist("tags[]")
-    tags = [t.strip().lower() for t in tags]
+    return make_response(jsonify(_listing_result(files, next_cursor, total)), 200)
 
-    tag_list = []
 
-    if tags:
-        tag_list = Tag.query.filter(Tag.tag.in_(tags)).all()
+def _listing_result(files, next_cursor, total):
+    file_tags, all_tags_list = get_page_tags(files)
 
-    files = PublishedFile().query.filter(*[PublishedFile.tags.contains(t) for t in tag_list], PublishedFile.status != "unpublished").order_by(desc(PublishedFile.publishing_date))
-    total = files.count()
-    files = files.limit(limit).offset(offset)
     data = []
-
-    tags_dict = defaultdict(lambda: 0)
-
     for file in files:
-        file_tag_list = []
-        for tag in file.tags:
-            file_tag_list.append(tag.tag)
-            tags_dict[tag.tag] += 1
-
         data.append({
             'uri': file.id,
             'file_name': file.file_name,
@@ -81,12 +67,13 @@ def list_files():
             'status': file.status,
             'downloads': file.downloads,
             'publishing_date': file.publishing_date.strftime('%Y-%m-%d'),
-            'tags': file_tag_list
+            'tags': file_tags[file.id]
         })
 
-    all_tags_list = [{"tag": key, "count": count} for key, count in tags_dict.items()]
-
-    return make_response(jsonify({'files': data, 'total': total, 'tags': all_tags_list}), 200)
+    result = {'files': data, 'tags': all_tags_list, 'next': next_cursor}
+    if total is not None:
+        result['total'] = total
+    return result
 
 
 @file.route('/api/tag/add/<file_id>', methods=['PUT'])
@@ -112,16 +99,15 @@ def tag_file(file_id):
 
     datafile = PublishedFile().query.get_or_404(file_id)
 
-    if not (datafile.owner == session['user']["username"] or session['user']["is_admin"]):
+    if not (datafile.owner == g.user["username"] or g.user["is_admin"]):
         return make_response(jsonify({}), 401)
 
     missing_tags = set(tags) - set([tag.tag for tag in datafile.tags])
     if missing_tags:
-        tag_entities = [get_or_create(db.session, Tag, tag=tag) for tag in missing_tags]
-        db.session.commit()
-        for tag in tag_entities:
-            datafile.tags.append(tag)
+        datafile.tags.extend(get_or_create_tags(missing_tags).values())
         db.session.commit()
+        current_app.response_cache.invalidate([datafile.id])
+        current_app.tag_index.update(dict((tag, 1) for tag in missing_tags))
 
     data = {
         "file": {
@@ -161,19 +147,18 @@ def untag_file(file_id):
 
     datafile = PublishedFile().query.get_or_404(file_id)
 
-    if not (datafile.owner == session['user']["username"] or session['user']["is_admin"]):
+    if not (datafile.owner == g.user["username"] or g.user["is_admin"]):
         return make_response(jsonify({}), 401)
 
     tags_to_remove = set(tags).intersection(set([tag.tag for tag in datafile.tags]))
 
-    for tag in datafile.tags:
-        if tag.tag in tags_to_remove:
-            if len(tag.files) == 1:
-                db.session.delete(tag)
-            else:
-                datafile.tags.remove(tag)
-
-    db.session.commit()
+    if tags_to_remove:
+        datafile.tags = [tag for tag in datafile.tags if tag.tag not in tags_to_remove]
+        db.session.flush()
+        delete_orphan_tags(tags_to_remove)
+        db.session.commit()
+        current_app.response_cache.invalidate([datafile.id])
+        current_app.tag_index.refresh(tags_to_remove)
 
     data = {
         "file": {
@@ -194,30 +179,13 @@ def untag_file(file_id):
 
 @file.route('/api/view/<file_id>', methods=['GET'])
 @is_valid_uid
+@cached_response("view")
 def view_file(file_id):
     datafile = PublishedFile().query.get_or_404(file_id)
 
-    repo = current_app.repos.get_repo(datafile.repo_path)
-    path = datafile.file_path
     current_app.logger.info("API call: Getting file %s" % file_id)
-    if os.path.exists(path):
-        # We don't know the status of Baricadr, so, check the size for completion
-        if datafile.status == "pulling" and os.path.getsize(path) == datafile.size:
-            datafile.status = "available"
-            db.session.commit()
-        # Should not happen: for testing/dev purposes
-        if datafile.status == "unavailable":
-            datafile.status = "available"
-            db.session.commit()
-    elif datafile.status == "available":
-        if repo.has_baricadr:
-            # TODO : Add baricadr check if the file exists
-            datafile.status = "pullable"
-        else:
-            datafile.status = "unavailable"
-        db.session.commit()
 
-    # TODO : How do we check the baricadr process? Store the task ID?
+    # The status is kept up to date by the scan_availability task, not here
 
     siblings = []
 
@@ -248,6 +216,20 @@ def view_file(file_id):
         }
     }
 
+    if datafile.checksums:
+        data["file"]["checksums"] = datafile.checksums
+
+    if datafile.status == "starting":
+        hashed_size = datafile.hashed_size or 0
+        eta = None
+        if datafile.hash_rate:
+            eta = int((datafile.size - hashed_size) / datafile.hash_rate)
+        data["file"]["progress"] = {
+            "hashed_size": hashed_size,
+            "throughput": datafile.hash_rate,
+            "eta": eta
+        }
+
     return make_response(jsonify(data), 200)
 
 
@@ -265,19 +247,74 @@ def download_file(file_id):
     if datafile.status == "unpublished":
         return make_response(jsonify({}), 404)
 
+    etag = _file_etag(datafile)
+    last_modified = datafile.publishing_date
+
+    # Answer conditional requests before touching the disk
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        res = make_response("", 304)
+        if etag:
+            res.set_etag(etag)
+        res.last_modified = last_modified
+        return res
+
     if os.path.exists(path):
-        datafile.downloads = datafile.downloads + 1
-        db.session.commit()
-        res = send_file(path, as_attachment=True)
+        # nginx cannot check If-Range against our ETag: stream these requests
+        use_x_accel = current_app.config.get("USE_X_SENDFILE") and "If-Range" not in request.headers
+
+        if not use_x_accel and request.range and len(request.range.ranges) > 1 and _if_range_matches(etag, last_modified):
+            res = ranges_response(path, request.range, os.path.getsize(path))
+            if etag:
+                res.set_etag(etag)
+            res.last_modified = last_modified
+        else:
+            # With X-Accel-Redirect, ranges are handled by nginx
+            res = send_file(path, as_attachment=True, etag=etag or False, last_modified=last_modified, conditional=not use_x_accel)
 
-        if current_app.config.get("USE_X_SENDFILE"):
+        res.headers['Accept-Ranges'] = "bytes"
+        if use_x_accel:
             res.headers['X-Accel-Redirect'] = path
             res.headers['X-Accel-Buffering'] = "no"
+
+        if request.method == "GET":
+            current_app.download_counter.record(datafile.id, *_served_bytes(res, datafile.size))
         return res
     else:
         return make_response(jsonify({'error': 'Missing file'}), 404)
 
 
+def _file_etag(datafile):
+    """Strong ETag derived from the file hash (None while it is being computed)"""
+    if datafile.status != "available" or not datafile.hash or datafile.hash == "Computing..":
+        return None
+    return datafile.hash
+
+
+def _if_range_matches(etag, last_modified):
+    """Whether a Range request should be honored given its If-Range header"""
+    if "If-Range" not in request.headers:
+        return True
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified, ignore_if_range=False)
+
+
+def _served_bytes(response, size):
+    """Return (bytes served, whether it is a range request) for a download response"""
+    if response.status_code == 206:
+        return response.content_length or 0, True
+
+    if request.range is None:
+        return size, False
+
+    # Ranges not handled here (by nginx with X-Accel-Redirect)
+    served = 0
+    for start, stop in request.range.ranges:
+        if start < 0:
+            served += min(-start, size)
+        else:
+            served += max(0, min(stop if stop is not None else size, size) - start)
+    return served, True
+
+
 @file.route('/api/pull/<file_id>', methods=['POST'])
 @is_valid_uid
 def pull_file(file_id):
@@ -362,12 +399,12 @@ def publish_file():
 
         version = len(linked_datafile.subversions) + 2
 
-    checks = repo.check_publish_file(request.json['path'], user_data=session['user'])
+    checks = repo.check_publish_file(request.json['path'], user_data=g.user)
 
     if checks["error"]:
         return make_response(jsonify({'error': 'Error checking file : %s' % checks["error"]}), 400)
 
-    celery_status = get_celery_worker_status(current_app.celery)
+    celery_status = current_app.worker_monitor.get_status()
     if celery_status['availability'] is None:
         current_app.logger.error("Received publish request on path '%s', but no Celery worker available to process the request. Aborting." % request.json['path'])
         return jsonify({'error': 'No Celery worker available to process the request'}), 400
@@ -390,24 +427,184 @@ def publish_file():
         except EmailNotValidError as e:
             return make_response(jsonify({'error': str(e)}), 400)
 
-    file_id = repo.publish_file(request.json['path'], session['user'], version=version, email=email, contact=contact, linked_to=linked_datafile, tags=tags)
+    file_id = repo.publish_file(request.json['path'], g.user, version=version, email=email, contact=contact, linked_to=linked_datafile, tags=tags)
+    current_app.response_cache.invalidate_files([file_id])
+    current_app.tag_index.update(dict((tag, 1) for tag in tags))
 
     res = "File registering. An email will be sent to you when the file is ready." if email else "File registering. It should be ready soon"
 
     return make_response(jsonify({'message': res, 'file_id': file_id, 'version': version}), 200)
 
 
+@file.route('/api/publish/batch', methods=['POST'])
+@token_required
+def publish_files():
+
+    if not request.get_json(silent=True):
+        return make_response(jsonify({'error': 'Missing body'}), 400)
+    if not isinstance(request.json, dict):
+        return make_response(jsonify({'error': 'Body must be a JSON object'}), 400)
+
+    files = request.json.get('files')
+    if not files or not isinstance(files, list):
+        return make_response(jsonify({'error': 'Missing files'}), 400)
+
+    max_files = current_app.config.get('PUBLISH_BATCH_MAX_FILES')
+    if len(files) > max_files:
+        return make_response(jsonify({'error': 'Too many files: at most %s files can be published at once' % max_files}), 400)
+
+    common_tags = request.json.get('tags', [])
+    if common_tags and not isinstance(common_tags, (list, str)):
+        return make_response(jsonify({'error': 'tags is neither a list nor a string'}), 400)
+    common_tags = _clean_tags(common_tags)
+
+    email = None
+    if request.json.get('email'):
+        try:
+            email = [validate_email(request.json['email'])["email"]]
+        except EmailNotValidError as e:
+            return make_response(jsonify({'error': str(e)}), 400)
+
+    contact = None
+    if request.json.get('contact'):
+        try:
+            contact = validate_email(request.json['contact'])["email"]
+        except EmailNotValidError as e:
+            return make_response(jsonify({'error': str(e)}), 400)
+
+    celery_status = current_app.worker_monitor.get_status()
+    if celery_status['availability'] is None:
+        current_app.logger.error("Received batch publish request, but no Celery worker available to process the request. Aborting.")
+        return jsonify({'error': 'No Celery worker available to process the request'}), 400
+
+    # The user is resolved once for the whole batch
+    identity = None
+    if current_app.config['GOLINK_RUN_MODE'] == "prod":
+        identity = current_app.ldap_client.get_identity(g.user['username'])
+        if identity.error:
+            return make_response(jsonify({'error': 'Error checking user : %s' % identity.error}), 400)
+
+    # Load all linked files in one query
+    linked_ids = set(item.get('linked_to') for item in files if isinstance(item, dict) and item.get('linked_to') and is_valid_uuid(item.get('linked_to')))
+    linked_files = {}
+    if linked_ids:
+        linked_files = dict((str(linked.id), linked) for linked in PublishedFile.query.filter(PublishedFile.id.in_(linked_ids)))
+
+    results = []
+    to_publish = []
+    versions = {}
+    for item in files:
+        if isinstance(item, str):
+            item = {'path': item}
+        result, data = _check_batch_item(item, linked_files, versions, common_tags, contact, identity)
+        results.append(result)
+        if data:
+            data['result'] = result
+            to_publish.append(data)
+
+    if to_publish:
+        tag_entities = get_or_create_tags(set().union(*[data['tags'] for data in to_publish]))
+        for data in to_publish:
+            data['published_file'] = data['repo'].create_published_file(data['path'], g.user, version=data['version'], contact=data['contact'], linked_to=data['linked_to'], tags=[tag_entities[tag] for tag in data['tags']])
+
+        db.session.flush()
+        for data in to_publish:
+            file_id = data['published_file'].id
+            enqueue_task("publish", (str(file_id), data['path'], email))
+            data['result']['file_id'] = file_id
+        db.session.commit()
+        current_app.response_cache.invalidate_files([data['result']['file_id'] for data in to_publish])
+        current_app.tag_index.update(Counter(tag for data in to_publish for tag in data['tags']))
+
+    res = "%s file(s) registering." % len(to_publish)
+    if to_publish:
+        res += " An email will be sent to you when each file is ready." if email else " They should be ready soon"
+
+    return make_response(jsonify({'message': res, 'files': results}), 200)
+
+
+def _clean_tags(tags):
+    if isinstance(tags, str):
+        tags = [tags]
+    return set([t.strip().lower() for t in tags])
+
+
+def _check_batch_item(item, linked_files, versions, common_tags, contact, identity):
+    # Check a single file of a batch publish request
+    # Returns the result to send back, and the publishing data if the file can be published
+    if not isinstance(item, dict) or not item.get('path') or not isinstance(item['path'], str):
+        return {'path': None, 'error': 'Missing path'}, None
+
+    path = item['path']
+    result = {'path': path}
+
+    if not os.path.exists(path):
+        return dict(result, error='File not found at path %s' % path), None
+
+    if os.path.isdir(path):
+        return dict(result, error='Path must not be a folder'), None
+
+    repo = current_app.repos.get_repo(path)
+    if not repo:
+        return dict(result, error='File %s is not in any publishable repository' % path), None
+
+    tags = item.get('tags', [])
+    if tags and not isinstance(tags, (list, str)):
+        return dict(result, error='tags is neither a list nor a string'), None
+    tags = _clean_tags(tags) | common_tags
+
+    if item.get('contact'):
+        try:
+            contact = validate_email(item['contact'])["email"]
+        except EmailNotValidError as e:
+            return dict(result, error=str(e)), None
+
+    version = 1
+    linked_datafile = None
+    linked_to = item.get('linked_to')
+    if linked_to:
+        if not is_valid_uuid(linked_to):
+            return dict(result, error='linked_to %s is not a valid id' % linked_to), None
+        linked_datafile = linked_files.get(linked_to)
+
+        if not linked_datafile:
+            return dict(result, error='linked_to %s file does not exists' % linked_to), None
+
+        if not linked_datafile.repo_path == repo.local_path:
+            return dict(result, error='linked_to %s file is not in the same repository' % linked_to), None
+
+        if linked_datafile.version_of:
+            linked_datafile = linked_datafile.version_of
+
+        if item.get('inherit_tags', True):
+            tags |= set([tag.tag for tag in linked_datafile.tags])
+
+        # Several files of the batch can be new versions of the same file
+        if linked_datafile.id not in versions:
+            versions[linked_datafile.id] = len(linked_datafile.subversions) + 1
+        versions[linked_datafile.id] += 1
+        version = versions[linked_datafile.id]
+
+    checks = repo.check_publish_file(path, user_data=g.user, identity=identity)
+    if checks["error"]:
+        return dict(result, error='Error checking file : %s' % checks["error"]), None
+
+    result['version'] = version
+    return result, {'path': path, 'repo': repo, 'tags': tags, 'contact': contact, 'linked_to': linked_datafile, 'version': version}
+
+
 @file.route('/api/unpublish/<file_id>', methods=['DELETE'])
 @is_valid_uid
 @token_required
 def unpublish_file(file_id):
     datafile = PublishedFile().query.get_or_404(file_id)
 
-    if not (datafile.owner == session['user']["username"] or session['user']["is_admin"]):
+    if not (datafile.owner == g.user["username"] or g.user["is_admin"]):
         return make_response(jsonify({}), 401)
 
     datafile.status = "unpublished"
     db.session.commit()
+    current_app.response_cache.invalidate_files([file_id], listings=FILE_LISTINGS)
     return make_response(jsonify({'message': 'File unpublished'}), 200)
 
 
@@ -417,74 +614,52 @@ def unpublish_file(file_id):
 @is_valid_uid
 def delete_file(file_id):
     datafile = PublishedFile().query.get_or_404(file_id)
+    family = current_app.response_cache.file_family([file_id])
+    tags = [tag.tag for tag in datafile.tags]
 
     db.session.delete(datafile)
     db.session.commit()
+    current_app.response_cache.invalidate(family)
+    current_app.tag_index.update(dict((tag, -1) for tag in tags))
 
     return make_response(jsonify({'message': 'File deleted'}), 200)
 
 
 @file.route('/api/search', methods=['GET'])
+@cached_response("search")
 def search():
 
-    offset = request.args.get('offset', 0)
-
     try:
-        offset = int(offset)
-    except ValueError:
-        offset = 0
-
-    limit = request.args.get('limit', 10)
-
-    try:
-        limit = int(limit)
-    except ValueError:
-        limit = 0
+        pagination = parse_pagination(request.args)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
 
     file_name = request.args.get("file", "")
-    tags = request.args.getlist("tags") or request.args.getlist("tags[]")
-
-    tags = [t.strip().lower() for t in tags]
+    tag_filters = parse_tag_filters(request.args)
 
-    tag_list = []
+    match = request.args.get("match", "contains")
+    if match not in MATCH_MODES:
+        return make_response(jsonify({'error': 'match must be one of %s' % ", ".join(MATCH_MODES)}), 400)
 
-    if tags:
-        tag_list = Tag.query.filter(Tag.tag.in_(tags)).all()
+    sort = request.args.get("sort", "date")
+    if sort not in SORT_MODES:
+        return make_response(jsonify({'error': 'sort must be one of %s' % ", ".join(SORT_MODES)}), 400)
 
-    if not (file_name or tag_list):
+    if not (file_name or tag_filters["tags"] or tag_filters["any_tags"]):
         return make_response(jsonify({'files': [], 'total': 0}), 200)
 
+    order_by = None
     if file_name and is_valid_uuid(file_name):
-        files = PublishedFile().query.order_by(desc(PublishedFile.publishing_date)).filter(*[PublishedFile.tags.contains(t) for t in tag_list], PublishedFile.id != file_name, PublishedFile.status != "unpublished")
+        files = PublishedFile().query.filter(PublishedFile.id != file_name, PublishedFile.status != "unpublished")
     else:
-        files = PublishedFile().query.order_by(desc(PublishedFile.publishing_date)).filter(*[PublishedFile.tags.contains(t) for t in tag_list], func.lower(PublishedFile.file_name).contains(file_name.lower()), PublishedFile.status != "unpublished")
-
-    total = files.count()
-
-    files = files.limit(limit).offset(offset)
-
-    data = []
-
-    tags_dict = defaultdict(lambda: 0)
-
-    for file in files:
-        file_tag_list = []
-        for tag in file.tags:
-            file_tag_list.append(tag.tag)
-            tags_dict[tag.tag] += 1
+        files = filter_file_name(PublishedFile().query.filter(PublishedFile.status != "unpublished"), file_name, match)
+        if file_name and sort == "relevance":
+            order_by = relevance_order(file_name)
+    files = filter_tags(files, **tag_filters)
 
-    for file in files:
-        data.append({
-            'uri': file.id,
-            'file_name': file.file_name,
-            'size': file.size,
-            'version': file.version,
-            'status': file.status,
-            'downloads': file.downloads,
-            "publishing_date": file.publishing_date.strftime('%Y-%m-%d'),
-            'tags': file_tag_list
-        })
-
-    all_tags_list = [{"tag": key, "count": count} for key, count in tags_dict.items()]
+    try:
+        files, next_cursor, total = paginate(files, order_by=order_by, **pagination)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
 
-    return make_response(jsonify({'files': data, 'total': total, 'tags': all_tags_list}), 200)
+    return make_response(jsonify(_listing_result(files, next_cursor, total)), 200)
@@ -0,0 +1,73 @@
+import os
+
+from flask import (Blueprint, current_app, g, jsonify, make_response, request)
+
+from golink.decorators import token_required
+
+repos = Blueprint('repos', __name__, url_prefix='/')
+
+
+def _get_identity():
+    # The user is resolved once per request, whatever the number of paths
+    if current_app.config['GOLINK_RUN_MODE'] == "prod":
+        return current_app.ldap_client.get_identity(g.user['username'])
+    return None
+
+
+def _check_path(path, identity):
+    # Same checks as /api/publish, so that the dry run cannot disagree with it
+    if not os.path.exists(path):
+        return {'path': path, 'repo': None, 'can_publish': False, 'error': 'File not found at path %s' % path}
+
+    if os.path.isdir(path):
+        return {'path': path, 'repo': None, 'can_publish': False, 'error': 'Path must not be a folder'}
+
+    repo = current_app.repos.get_repo(path)
+    if not repo:
+        return {'path': path, 'repo': None, 'can_publish': False, 'error': 'File %s is not in any publishable repository' % path}
+
+    checks = repo.check_publish_file(path, user_data=g.user, identity=identity)
+    return {'path': path, 'repo': repo.local_path, 'can_publish': checks["available"], 'error': checks["error"]}
+
+
+@repos.route('/api/repos/<path:repo_path>/can_publish', methods=['GET'])
+@token_required
+def can_publish(repo_path):
+    """
+    Check if the user can publish a file, without publishing it
+    """
+    path = os.path.join("/", repo_path)
+    if not current_app.repos.get_repo(path):
+        return make_response(jsonify({'error': 'File %s is not in any publishable repository' % path}), 404)
+
+    identity = _get_identity()
+    if identity and identity.error:
+        return make_response(jsonify({'error': 'Error checking user : %s' % identity.error}), 400)
+
+    return make_response(jsonify(_check_path(path, identity)), 200)
+
+
+@repos.route('/api/repos/can_publish', methods=['POST'])
+@token_required
+def can_publish_batch():
+    """
+    Check if the user can publish a list of files ({"paths": [...]}), without publishing them
+    """
+    if not request.get_json(silent=True):
+        return make_response(jsonify({'error': 'Missing body'}), 400)
+    if not isinstance(request.json, dict):
+        return make_response(jsonify({'error': 'Body must be a JSON object'}), 400)
+
+    paths = request.json.get('paths')
+    if not paths or not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+        return make_response(jsonify({'error': 'paths must be a list of paths'}), 400)
+
+    max_files = current_app.config.get('PUBLISH_BATCH_MAX_FILES')
+    if len(paths) > max_files:
+        return make_response(jsonify({'error': 'Too many paths (maximum %s)' % max_files}), 400)
+
+    identity = _get_identity()
+    if identity and identity.error:
+        return make_response(jsonify({'error': 'Error checking user : %s' % identity.error}), 400)
+
+    return make_response(jsonify({'files': [_check_path(path, identity) for path in paths]}), 200)
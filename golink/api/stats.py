@@ -0,0 +1,50 @@
+from flask import (Blueprint, current_app, jsonify, make_response, request)
+
+from golink.db_models import PublishedFile
+from golink.decorators import is_valid_uid
+from golink.model.stats import PERIODS, get_file_stats, get_top_files
+
+
+stats = Blueprint('stats', __name__, url_prefix='/')
+
+
+def _get_int_arg(name, default, maximum):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        value = default
+    return max(1, min(value, maximum))
+
+
+@stats.route('/api/stats/top', methods=['GET'])
+def top_files():
+    period = request.args.get("period", "day")
+    if period not in PERIODS:
+        return make_response(jsonify({'error': 'period must be one of %s' % ", ".join(PERIODS)}), 400)
+
+    # Number of days (or hours) to look back
+    duration = _get_int_arg("duration", 7 if period == "day" else 24, 366 if period == "day" else 24 * 31)
+    limit = _get_int_arg("limit", 10, 100)
+
+    return make_response(jsonify({'period': period, 'duration': duration, 'files': get_top_files(period, duration, limit)}), 200)
+
+
+@stats.route('/api/stats/<file_id>', methods=['GET'])
+@is_valid_uid
+def file_stats(file_id):
+    current_app.logger.info("API call: Getting statistics for file %s" % file_id)
+    datafile = PublishedFile().query.get_or_404(file_id)
+
+    period = request.args.get("period", "day")
+    if period not in PERIODS:
+        return make_response(jsonify({'error': 'period must be one of %s' % ", ".join(PERIODS)}), 400)
+
+    limit = _get_int_arg("limit", 30, 1000)
+
+    data = {
+        'uri': datafile.id,
+        'downloads': datafile.downloads,
+        'period': period,
+        'stats': get_file_stats(datafile.id, period, limit)
+    }
+    return make_response(jsonify(data), 200)
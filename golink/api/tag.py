@@ -1,12 +1,145 @@
-from flask import (Blueprint, jsonify, make_response)
+from flask import (Blueprint, current_app, g, jsonify, make_response, request)
 
-from golink.db_models import Tag
+from golink.db_models import PublishedFile
+from golink.decorators import cached_response, token_required
+from golink.extensions import db
+from golink.model.listing import filter_tags
+from golink.model.search import MATCH_MODES, filter_file_name
+from golink.model.tags import add_tags, delete_orphan_tags, get_tag_counts, remove_tags
+from golink.utils import is_valid_uuid
 
 tag = Blueprint('tag', __name__, url_prefix='/')
 
 
+def _get_limit(default):
+    try:
+        return int(request.args.get("limit", default))
+    except ValueError:
+        return None
+
+
+def _tag_names(value):
+    """Normalized tag names of a list (or a single string), None if invalid"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        return None
+    return sorted(set(name.strip().lower() for name in value if name.strip()))
+
+
 @tag.route('/api/tag/list', methods=['GET'])
+@cached_response("tags")
 def list_tags():
-    tag_list = [{"tag": tag.tag, "count": len(tag.files)} for tag in Tag.query.all()]
+    """
+    Tags with their number of files, most used first
+
+    Optional parameters: prefix (case insensitive) and limit
+    """
+    limit = _get_limit(0)
+    if limit is None:
+        return make_response(jsonify({'error': 'limit must be an integer'}), 400)
+
+    prefix = request.args.get("prefix", "").strip().lower()
+    tag_list = [{"tag": name, "count": count} for name, count in get_tag_counts(prefix, limit).items()]
 
     return make_response(jsonify({'tags': tag_list}), 200)
+
+
+@tag.route('/api/tag/suggest', methods=['GET'])
+def suggest_tags():
+    """Most used tags starting with prefix, from the in-memory tag index"""
+    limit = _get_limit(10)
+    if limit is None or limit < 1:
+        return make_response(jsonify({'error': 'limit must be a positive integer'}), 400)
+
+    current_app.tag_index.load()
+    prefix = request.args.get("prefix", "").strip().lower()
+    tag_list = [{"tag": name, "count": count} for name, count in current_app.tag_index.suggest(prefix, limit)]
+
+    return make_response(jsonify({'tags': tag_list}), 200)
+
+
+@tag.route('/api/tag/bulk', methods=['POST'])
+@token_required
+def bulk_tag():
+    """
+    Add and remove tags on many files at once, in a single transaction
+
+    Files are either given by id ('files'), or selected by a search ('query', with the file, match, tags,
+    any_tags and not_tags parameters of /api/search). Only admins can change files they do not own.
+    Tags left without any file are deleted.
+    """
+    body = request.get_json(silent=True)
+    if not body:
+        return make_response(jsonify({'error': 'Missing body'}), 400)
+    if not isinstance(body, dict):
+        return make_response(jsonify({'error': 'Body must be a JSON object'}), 400)
+
+    to_add = _tag_names(body.get('add'))
+    to_remove = _tag_names(body.get('remove'))
+    if to_add is None or to_remove is None:
+        return make_response(jsonify({'error': 'add and remove must be lists or strings'}), 400)
+    if not (to_add or to_remove):
+        return make_response(jsonify({"error": "Missing tags"}), 400)
+    if set(to_add) & set(to_remove):
+        return make_response(jsonify({'error': 'A tag cannot be both added and removed'}), 400)
+
+    user = g.user
+
+    if 'files' in body:
+        file_ids = body['files']
+        if not isinstance(file_ids, list) or not all(isinstance(file_id, str) and is_valid_uuid(file_id) for file_id in file_ids):
+            return make_response(jsonify({'error': 'files must be a list of file ids'}), 400)
+
+        files = db.session.query(PublishedFile.id, PublishedFile.owner).filter(PublishedFile.id.in_(file_ids)).all()
+        if len(files) < len(set(file_ids)):
+            return make_response(jsonify({'error': 'Unknown files'}), 404)
+        if not user["is_admin"] and any(owner != user["username"] for file_id, owner in files):
+            return make_response(jsonify({}), 401)
+        file_ids = [file_id for file_id, owner in files]
+
+    elif 'query' in body:
+        query = body['query']
+        if not isinstance(query, dict):
+            return make_response(jsonify({'error': 'query must be an object'}), 400)
+
+        file_name = query.get("file", "")
+        match = query.get("match", "contains")
+        if match not in MATCH_MODES:
+            return make_response(jsonify({'error': 'match must be one of %s' % ", ".join(MATCH_MODES)}), 400)
+
+        tag_filters = dict((key, _tag_names(query.get(key))) for key in ("tags", "any_tags", "not_tags"))
+        if None in tag_filters.values() or not isinstance(file_name, str):
+            return make_response(jsonify({'error': 'Invalid query'}), 400)
+        # Like /api/search, never select the whole catalogue
+        if not (file_name or tag_filters["tags"] or tag_filters["any_tags"]):
+            return make_response(jsonify({'error': 'query must filter on a file name or tags'}), 400)
+
+        files = db.session.query(PublishedFile.id).filter(PublishedFile.status != "unpublished")
+        files = filter_tags(filter_file_name(files, file_name, match), **tag_filters)
+        if not user["is_admin"]:
+            files = files.filter(PublishedFile.owner == user["username"])
+        file_ids = [file_id for file_id, in files]
+
+    else:
+        return make_response(jsonify({'error': 'Missing files or query'}), 400)
+
+    added = add_tags(file_ids, to_add)
+    removed = remove_tags(file_ids, to_remove)
+    deleted_tags = delete_orphan_tags(to_remove) if removed else 0
+    db.session.commit()
+
+    current_app.logger.info("Bulk tagging of %s files: %s links added, %s removed" % (len(file_ids), added, removed))
+    if added or removed:
+        current_app.response_cache.invalidate_files(file_ids)
+        current_app.tag_index.refresh(to_add + to_remove)
+
+    data = {
+        'files': len(file_ids),
+        'added': added,
+        'removed': removed,
+        'deleted_tags': deleted_tags
+    }
+    return make_response(jsonify(data), 200)
@@ -4,8 +4,6 @@ from flask import (Blueprint, current_app, jsonify, make_response, request)
 
 from golink.utils import authenticate_user
 
-import jwt
-
 token = Blueprint('token', __name__, url_prefix='/')
 
 
@@ -20,9 +18,11 @@ def create_token():
 
     # Only check ldap in prod
     if current_app.config['GOLINK_RUN_MODE'] == "prod":
-        if not authenticate_user(request.json.get("username"), request.json.get("password"), request.json.get("api_key"), current_app.config):
+        if not authenticate_user(request.json.get("username"), request.json.get("password"), request.json.get("api_key"), current_app.config, current_app.ldap_client):
             return make_response(jsonify({'error': 'Incorrect credentials'}), 401)
 
+    import jwt
+
     expire_date = datetime.utcnow() + timedelta(hours=current_app.config.get('TOKEN_DURATION'))
     token = jwt.encode({"username": request.json.get("username"), "exp": expire_date}, current_app.config['SECRET_KEY'], algorithm="HS256")
     return make_response(jsonify({'token': token}), 200)
@@ -1,31 +1,43 @@
 import os
 import grp
 import pwd
+import time
+from collections import OrderedDict
 
 from celery import Celery
 
 from flask import Flask, g
 
+from golink.api.admin import admin
 from golink.api.file import file
+from golink.api.repos import repos
+from golink.api.stats import stats
 from golink.api.tag import tag
 from golink.api.token import token
 from golink.api.view import view
 
-from ldap3 import Connection, NONE, Server
-
-import requests
-
 # Import model classes for flaks migrate
 from .db_models import PublishedFile  # noqa: F401
-from .extensions import (celery, db, mail, migrate)
+from .extensions import (celery, db, mail)
+from .hashing import check_algorithms
 from .middleware import PrefixMiddleware
+from .cache import ResponseCache
+from .downloads import DownloadCounter
+from .monitor import WorkerMonitor
+from .ldap_client import LdapClient
+from .probes import DependencyProbe
+from .tag_index import TagIndex
+from .tokens import TokenCache
 from .model.repos import Repos
 
 
 __all__ = ('create_app', 'create_celery', )
 
 BLUEPRINTS = (
+    admin,
     file,
+    repos,
+    stats,
     tag,
     token,
     view
@@ -62,10 +74,31 @@ CONFIG_KEYS = (
     'LDAP_HOST',
     'LDAP_PORT',
     'LDAP_BASE_QUERY',
+    'LDAP_TIMEOUT',
+    'LDAP_POOL_SIZE',
+    'LDAP_CACHE_TTL',
     'TOKEN_DURATION',
+    'TOKEN_CACHE_SIZE',
     'ADMIN_USERS',
     'PROXY_PREFIX',
-    'ADMIN_API_KEYS'
+    'ADMIN_API_KEYS',
+    'HASH_BUFFER_SIZE',
+    'HASH_CHECKPOINT_SIZE',
+    'HASH_PROGRESS_INTERVAL',
+    'TASK_VISIBILITY_TIMEOUT',
+    'DOWNLOAD_FLUSH_INTERVAL',
+    'DOWNLOAD_COUNTER_BACKEND',
+    'DOWNLOAD_ROLLUP_INTERVAL',
+    'AVAILABILITY_SCAN_INTERVAL',
+    'AVAILABILITY_SCAN_THREADS',
+    'RESPONSE_CACHE',
+    'RESPONSE_CACHE_TTL',
+    'RESPONSE_CACHE_MAX_ENTRIES',
+    'RESPONSE_CACHE_REDIS_URL',
+    'TAG_INDEX_REFRESH_INTERVAL',
+    'REPOS_RELOAD_INTERVAL',
+    'PROBE_INTERVAL',
+    'PROBE_TIMEOUT'
 )
 
 
@@ -75,6 +108,8 @@ def create_app(config=None, app_name='golink', blueprints=None, run_mode=None, i
                 template_folder="templates"
                 )
 
+    timer = _PhaseTimer()
+
     with app.app_context():
 
         # Can be used to check if some code is executed in a Celery worker, or in the web app
@@ -119,7 +154,38 @@ def create_app(config=None, app_name='golink', blueprints=None, run_mode=None, i
         if not type(admin_users) == list:
             raise ValueError("ADMIN_USERS variable is not a list")
 
-        app.config["ADMIN_USERS"] = admin_users
+        # Checked on each request
+        app.config["ADMIN_USERS"] = frozenset(admin_users)
+        app.config["TOKEN_CACHE_SIZE"] = _get_int_conf(app.config, "TOKEN_CACHE_SIZE", 1024)
+
+        hash_algorithms = check_algorithms(app.config.get("HASH_ALGORITHMS", ["md5"]))
+        if "md5" not in hash_algorithms:
+            hash_algorithms.insert(0, "md5")
+        app.config["HASH_ALGORITHMS"] = hash_algorithms
+
+        app.config["HASH_BUFFER_SIZE"] = _get_int_conf(app.config, "HASH_BUFFER_SIZE", 8 * 1024 * 1024, minimum=1)
+        app.config["HASH_CHECKPOINT_SIZE"] = _get_int_conf(app.config, "HASH_CHECKPOINT_SIZE", 1024 * 1024 * 1024)
+        app.config["HASH_PROGRESS_INTERVAL"] = _get_int_conf(app.config, "HASH_PROGRESS_INTERVAL", 10)
+        app.config["TASK_VISIBILITY_TIMEOUT"] = _get_int_conf(app.config, "TASK_VISIBILITY_TIMEOUT", 24 * 3600, minimum=1)
+        app.config["DOWNLOAD_FLUSH_INTERVAL"] = _get_int_conf(app.config, "DOWNLOAD_FLUSH_INTERVAL", 10)
+        app.config["DOWNLOAD_ROLLUP_INTERVAL"] = _get_int_conf(app.config, "DOWNLOAD_ROLLUP_INTERVAL", 300, minimum=1)
+        app.config["AVAILABILITY_SCAN_INTERVAL"] = _get_int_conf(app.config, "AVAILABILITY_SCAN_INTERVAL", 600, minimum=1)
+        app.config["AVAILABILITY_SCAN_THREADS"] = _get_int_conf(app.config, "AVAILABILITY_SCAN_THREADS", 8, minimum=1)
+
+        if app.config.get("DOWNLOAD_COUNTER_BACKEND", "memory") not in ("memory", "redis"):
+            raise ValueError("Malformed configuration for DOWNLOAD_COUNTER_BACKEND : must be 'memory' or 'redis'")
+
+        if app.config.get("RESPONSE_CACHE", "memory") not in ("memory", "redis", "none"):
+            raise ValueError("Malformed configuration for RESPONSE_CACHE : must be 'memory', 'redis' or 'none'")
+        app.config["RESPONSE_CACHE_TTL"] = _get_int_conf(app.config, "RESPONSE_CACHE_TTL", 10, minimum=1)
+        app.config["RESPONSE_CACHE_MAX_ENTRIES"] = _get_int_conf(app.config, "RESPONSE_CACHE_MAX_ENTRIES", 1000, minimum=1)
+        app.config["TAG_INDEX_REFRESH_INTERVAL"] = _get_int_conf(app.config, "TAG_INDEX_REFRESH_INTERVAL", 300)
+        app.config["REPOS_RELOAD_INTERVAL"] = _get_int_conf(app.config, "REPOS_RELOAD_INTERVAL", 10)
+        app.config["PROBE_INTERVAL"] = _get_int_conf(app.config, "PROBE_INTERVAL", 60, minimum=1)
+        app.config["PROBE_TIMEOUT"] = _get_int_conf(app.config, "PROBE_TIMEOUT", 5, minimum=1)
+        app.config["LDAP_TIMEOUT"] = _get_int_conf(app.config, "LDAP_TIMEOUT", 5, minimum=1)
+        app.config["LDAP_POOL_SIZE"] = _get_int_conf(app.config, "LDAP_POOL_SIZE", 4, minimum=1)
+        app.config["LDAP_CACHE_TTL"] = _get_int_conf(app.config, "LDAP_CACHE_TTL", 300)
 
         if 'TASK_LOG_DIR' in app.config:
             app.config['TASK_LOG_DIR'] = os.path.abspath(app.config['TASK_LOG_DIR'])
@@ -132,43 +198,107 @@ def create_app(config=None, app_name='golink', blueprints=None, run_mode=None, i
         if app.config.get("PROXY_PREFIX"):
             app.wsgi_app = PrefixMiddleware(app.wsgi_app, prefix=app.config.get("PROXY_PREFIX").rstrip("/"))
 
+        timer.mark("config")
+
+        # External services are checked in the background (see start_probes), startup does not wait for them
+        app.probes = {}
+
+        app.ldap_client = LdapClient(app.config)
         if config_mode == "prod":
             # Check ldap
             if not app.config.get("LDAP_HOST"):
                 raise Exception("Missing LDAP_HOST in conf")
             if not app.config.get("LDAP_BASE_QUERY"):
                 raise Exception("Missing LDAP_BASE_QUERY in conf")
-            if not check_ldap(app.config):
-                raise Exception("Could not connect to the LDAP")
+            # Workers never use the LDAP (and do not import ldap3)
+            if not app.is_worker:
+                app.probes["ldap"] = DependencyProbe("LDAP", app.ldap_client.check, interval=app.config["PROBE_INTERVAL"], logger=app.logger)
 
+        # Enabled once the probe succeeds
         app.baricadr_enabled = False
         if app.config.get('USE_BARICADR') is True:
-            # TODO : Print error somewhere...
-            if check_baricadr(app.config):
-                app.baricadr_enabled = True
+            app.probes["baricadr"] = DependencyProbe(
+                "Baricadr",
+                lambda: check_baricadr(app.config, timeout=app.config["PROBE_TIMEOUT"]),
+                interval=app.config["PROBE_INTERVAL"],
+                on_result=lambda result: setattr(app, "baricadr_enabled", result),
+                logger=app.logger
+            )
+
+        timer.mark("dependencies")
 
         # Load the list of golink repositories
         if 'GOLINK_REPOS_CONF' in app.config:
             repos_file = app.config['GOLINK_REPOS_CONF']
         else:
             repos_file = os.getenv('GOLINK_REPOS_CONF', '/etc/golink/repos.yml')
-        app.repos = Repos(repos_file)
+        app.repos = Repos(repos_file, reload_interval=app.config["REPOS_RELOAD_INTERVAL"])
+        timer.mark("repos")
 
         if blueprints is None:
             blueprints = BLUEPRINTS
 
         blueprints_fabrics(app, blueprints)
+        timer.mark("blueprints")
         extensions_fabrics(app)
+        timer.mark("extensions")
         configure_logging(app)
+        timer.mark("logging")
+
+        app.download_counter = DownloadCounter(app)
+        app.response_cache = ResponseCache(app.config, is_worker=app.is_worker)
+        app.tag_index = TagIndex(refresh_interval=app.config["TAG_INDEX_REFRESH_INTERVAL"])
+        app.token_cache = TokenCache(app.config)
 
         gvars(app)
+        timer.mark("services")
+
+        start_probes(app)
+        timer.mark("probes")
+
+        # Duration (in seconds) of each phase, see benchmarks/startup.py
+        app.startup_timings = timer.phases
 
     return app
 
 
+class _PhaseTimer():
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+
+def start_probes(app):
+    """Start checking the external services in the background"""
+    for probe in app.probes.values():
+        probe.start()
+
+
 def create_celery(app):
     celery = Celery(app.import_name, broker=app.config['CELERY_BROKER_URL'])
     celery.conf.update(app.config)
+    # Publishing tasks are acknowledged late: they must not be delivered to another worker while being hashed
+    celery.conf.update(BROKER_TRANSPORT_OPTIONS=dict(app.config.get('BROKER_TRANSPORT_OPTIONS') or {}, visibility_timeout=app.config['TASK_VISIBILITY_TIMEOUT']))
+    celery.conf.update(CELERYBEAT_SCHEDULE={
+        'dispatch-outbox': {
+            'task': 'dispatch_outbox',
+            'schedule': app.config.get('OUTBOX_DISPATCH_INTERVAL', 60)
+        },
+        'rollup-downloads': {
+            'task': 'rollup_downloads',
+            'schedule': app.config.get('DOWNLOAD_ROLLUP_INTERVAL', 300)
+        },
+        'scan-availability': {
+            'task': 'scan_availability',
+            'schedule': app.config.get('AVAILABILITY_SCAN_INTERVAL', 600)
+        }
+    })
     TaskBase = celery.Task
 
     class ContextTask(TaskBase):
@@ -180,6 +310,7 @@ def create_celery(app):
     celery.Task = ContextTask
 
     app.celery = celery
+    app.worker_monitor = WorkerMonitor(celery, app.config)
     return celery
 
 
@@ -193,7 +324,10 @@ def blueprints_fabrics(app, blueprints):
 def extensions_fabrics(app):
     db.init_app(app)
     mail.init_app(app)
-    migrate.init_app(app, db)
+    # flask-migrate imports alembic, it is only needed by the 'flask db' commands
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        from flask_migrate import Migrate
+        Migrate(app, db)
     celery.config_from_object(app.config)
 
 
@@ -270,21 +404,27 @@ def _merge_conf_with_env_vars(config):
     return config
 
 
-def check_baricadr(config):
+def _get_int_conf(config, key, default, minimum=0):
+    value = config.get(key, default)
+    try:
+        value = int(value)
+    except ValueError:
+        value = None
+
+    if value is None or value < minimum:
+        raise ValueError("Malformed configuration for %s : must be an integer greater or equal to %s" % (key, minimum))
+
+    return value
+
+
+def check_baricadr(config, timeout=5):
+    import requests
+
     baricadr_enabled = False
     if (config.get("BARICADR_URL") and config.get("BARICADR_USER") and config.get("BARICADR_PASSWORD")):
         url = "%s/version" % config.get("BARICADR_URL")
-        res = requests.get(url, auth=(config.get("BARICADR_USER"), config.get("BARICADR_PASSWORD")))
+        res = requests.get(url, auth=(config.get("BARICADR_USER"), config.get("BARICADR_PASSWORD")), timeout=timeout)
         # TODO : Maybe restrict compatible versions here?
         if res.status_code == 200 and "version" in res.json():
             baricadr_enabled = True
     return baricadr_enabled
-
-
-def check_ldap(config):
-    server = Server(config.get("LDAP_HOST"), config.get("LDAP_PORT", 389), get_info=NONE)
-    conn = Connection(server, auto_bind=True)
-    # Basic query to see if it works
-    has_ldap = conn.bind()
-    conn.unbind()
-    return has_ldap
@@ -0,0 +1,229 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from golink.db_models import PublishedFile
+from golink.extensions import db
+from golink.utils import redis_error
+
+from sqlalchemy import func, or_
+
+
+CACHE_PREFIX = "golink:cache:"
+VERSION_PREFIX = "golink:version:"
+
+# Query parameters whose values order does not matter
+SET_ARGS = ("tags", "tags[]", "any_tags", "any_tags[]", "not_tags", "not_tags[]")
+
+# Cached listings, and those showing the files status (tag counts do not depend on it)
+LISTINGS = ("list", "search", "tags")
+FILE_LISTINGS = ("list", "search")
+
+
+class MemoryBackend():
+    """LRU cache with per-entry expiration, local to the process"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        return {'entries': len(self._entries), 'evictions': self.evictions}
+
+
+class RedisBackend():
+    """Cache shared by all the web processes"""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def get(self, key):
+        value = self.redis.get(CACHE_PREFIX + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.redis.set(CACHE_PREFIX + key, json.dumps(value), ex=ttl)
+
+    def stats(self):
+        # Entries are evicted by redis itself
+        return {'entries': None, 'evictions': None}
+
+
+class MemoryVersions():
+    """Versions of the cached data (files and listings), local to the process"""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._versions.get(key, 0)
+
+    def change(self, keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+
+class RedisVersions():
+    """
+    Versions of the cached data, shared by all the web processes and the workers
+
+    A new version is a random value, not a counter: a version key can expire (after the cached entries
+    using it) without an older version coming back.
+    """
+
+    def __init__(self, redis, expire):
+        self.redis = redis
+        self.expire = expire
+
+    def get(self, key):
+        value = self.redis.get(VERSION_PREFIX + key)
+        return value.decode() if value is not None else 0
+
+    def change(self, keys):
+        pipeline = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.set(VERSION_PREFIX + key, uuid.uuid4().hex, ex=self.expire)
+        pipeline.execute()
+
+
+class ResponseCache():
+    """
+    Cache of the read-only API responses
+
+    Cache keys include the version of the data they depend on: the file for file views (shared by all
+    the versions of a file, shown in each other's views), the listing for listings (list, search, tags),
+    which depend on the whole catalogue. Invalidating changes these versions, and entries with an older one
+    are not used anymore (and expire).
+
+    Versions are kept in redis (RESPONSE_CACHE_REDIS_URL, or the celery broker), so that changes made by
+    any web process or worker are seen by all of them, whatever the backend storing the entries:
+    'memory' (per web process) or 'redis' (shared). With RESPONSE_CACHE_SHARED = False, versions are local
+    to the process: only for a single web process without workers (tests).
+    """
+
+    def __init__(self, config, is_worker=False):
+        self.backend_name = config.get("RESPONSE_CACHE", "memory")
+        self.ttl = config.get("RESPONSE_CACHE_TTL", 10)
+        self.shared = self.backend_name == "redis" or (self.backend_name == "memory" and config.get("RESPONSE_CACHE_SHARED", True))
+
+        client = None
+        if self.shared:
+            import redis
+
+            client = redis.Redis.from_url(config.get("RESPONSE_CACHE_REDIS_URL") or config["CELERY_BROKER_URL"], socket_timeout=1, socket_connect_timeout=1)
+
+        # Workers do not read the cache, but invalidate it
+        self.versions = None
+        if self.shared:
+            # Versions must outlive the entries using them
+            self.versions = RedisVersions(client, self.ttl + 60)
+        elif self.backend_name == "memory":
+            self.versions = MemoryVersions()
+
+        self.backend = None
+        if self.backend_name == "memory" and not is_worker:
+            self.backend = MemoryBackend(config.get("RESPONSE_CACHE_MAX_ENTRIES", 1000))
+        elif self.backend_name == "redis" and not is_worker:
+            self.backend = RedisBackend(client)
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def make_key(self, name, args, file_id=None):
+        """Cache key of a request: the file id for file views, the normalized query parameters for listings"""
+        if file_id:
+            file_id = uuid.UUID(str(file_id))
+            return "%s:%s:%s" % (name, file_id, self.versions.get("file:%s" % file_id))
+
+        items = []
+        for key in sorted(set(args.keys())):
+            values = args.getlist(key)
+            if key in SET_ARGS:
+                values = sorted(set(value.strip().lower() for value in values))
+            items.extend((key, value) for value in values)
+
+        return "%s:%s:%s" % (name, self.versions.get("listing:%s" % name), urlencode(items))
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def file_family(self, file_ids):
+        """Ids of the given files and of all their versions (shown in each other's views)"""
+        if self.versions is None or not file_ids:
+            return []
+
+        roots = [root for root, in db.session.query(func.coalesce(PublishedFile.version_of_id, PublishedFile.id)).filter(PublishedFile.id.in_(file_ids))]
+        family = set(str(file_id) for file_id in file_ids)
+        if roots:
+            family.update(str(file_id) for file_id, in db.session.query(PublishedFile.id).filter(or_(PublishedFile.id.in_(roots), PublishedFile.version_of_id.in_(roots))))
+        return sorted(family)
+
+    def invalidate(self, file_ids=(), listings=LISTINGS):
+        """Drop the cached views of the given files, and the given listings (all by default)"""
+        keys = ["file:%s" % uuid.UUID(str(file_id)) for file_id in file_ids] + ["listing:%s" % listing for listing in listings]
+        if self.versions is None or not keys:
+            return
+
+        try:
+            self.versions.change(keys)
+        except redis_error():
+            self.errors += 1
+
+    def invalidate_files(self, file_ids, listings=LISTINGS):
+        self.invalidate(self.file_family(file_ids), listings=listings)
+
+    def stats(self):
+        data = {
+            'backend': self.backend_name,
+            'enabled': self.enabled,
+            'shared': self.shared,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_ratio': round(self.hits / (self.hits + self.misses), 3) if self.hits + self.misses else None
+        }
+        if self.enabled:
+            data.update(self.backend.stats())
+        return data
@@ -13,6 +13,16 @@ class BaseConfig(object):
     CELERY_TASK_SERIALIZER = 'json'
     CELERY_DISABLE_RATE_LIMITS = True
     CELERY_ACCEPT_CONTENT = ['json', ]
+    # Workers send a heartbeat every WORKER_HEARTBEAT_INTERVAL seconds, and are considered down after WORKER_HEARTBEAT_TIMEOUT seconds without one
+    WORKER_HEARTBEAT_INTERVAL = 5
+    WORKER_HEARTBEAT_TIMEOUT = 30
+    # Delay (in seconds) during which the workers status is reused
+    WORKER_STATUS_CACHE_TTL = 5
+    # Delay (in seconds) between two checks for tasks which could not be sent right after their transaction
+    OUTBOX_DISPATCH_INTERVAL = 60
+    # Delay (in seconds) after which a task not acknowledged by its worker is delivered again (redis broker)
+    # Publishing tasks are acknowledged once the file is hashed: must be longer than the longest hashing
+    TASK_VISIBILITY_TIMEOUT = 24 * 3600
 
     SQLALCHEMY_ECHO = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -20,12 +30,64 @@ class BaseConfig(object):
 
     LOG_FOLDER = "/var/log/golink/"
 
+    # Digests computed when publishing. md5 is always computed (stored as the file hash)
+    HASH_ALGORITHMS = ["md5"]
+    # Read buffer size (in bytes) used when hashing files
+    HASH_BUFFER_SIZE = 8 * 1024 * 1024
+    # Save the hashing state every HASH_CHECKPOINT_SIZE bytes, so that an interrupted task can resume (0 to disable)
+    # Only md5 and the sha1/sha2 algorithms can be resumed
+    HASH_CHECKPOINT_SIZE = 1024 * 1024 * 1024
+    # Delay (in seconds) between two saves of the hashing progress
+    HASH_PROGRESS_INTERVAL = 10
+    # Reuse the hash of files already hashed (same device, inode, size and mtime)
+    HASH_CACHE = True
+
+    # Downloads are counted in memory ('memory', per web process) or on the broker ('redis', shared),
+    # and saved to the database every DOWNLOAD_FLUSH_INTERVAL seconds (0: on each download)
+    DOWNLOAD_COUNTER_BACKEND = "memory"
+    DOWNLOAD_FLUSH_INTERVAL = 10
+    # Delay (in seconds) between two aggregations of the downloads into hourly and daily statistics
+    DOWNLOAD_ROLLUP_INTERVAL = 300
+    # Delay (in seconds) between two checks of the published files presence on disk (updating their status),
+    # and number of files checked in parallel
+    AVAILABILITY_SCAN_INTERVAL = 600
+    AVAILABILITY_SCAN_THREADS = 8
+    # Cache of the file views, listings and searches: 'memory' (per process), 'redis' (shared) or 'none'
+    RESPONSE_CACHE = "memory"
+    RESPONSE_CACHE_TTL = 10
+    RESPONSE_CACHE_MAX_ENTRIES = 1000
+    # Redis url for the 'redis' cache, and the cache invalidations (default: CELERY_BROKER_URL)
+    RESPONSE_CACHE_REDIS_URL = ""
+    # Share the invalidations (through redis) with the other web processes and the workers
+    # Only disable it with a single web process and no workers
+    RESPONSE_CACHE_SHARED = True
+    # The repositories file (GOLINK_REPOS_CONF) is checked for changes at most every REPOS_RELOAD_INTERVAL seconds
+    # by each process (0 to only read it at startup)
+    REPOS_RELOAD_INTERVAL = 10
+    # The tag suggestions index of each web process is rebuilt every TAG_INDEX_REFRESH_INTERVAL seconds
+    # (to include the changes made by other processes)
+    TAG_INDEX_REFRESH_INTERVAL = 300
+
     # Token validity duration (in hours)
     TOKEN_DURATION = 6
+    # Number of validated tokens kept in memory by each web process (0 to verify them on each request)
+    TOKEN_CACHE_SIZE = 1024
 
     ADMIN_USERS = []
+
+    # LDAP and Baricadr availability is checked in the background every PROBE_INTERVAL seconds
+    # (Baricadr requests time out after PROBE_TIMEOUT seconds, LDAP connections and requests after LDAP_TIMEOUT seconds)
+    PROBE_INTERVAL = 60
+    PROBE_TIMEOUT = 5
+    LDAP_TIMEOUT = 5
+    # Number of LDAP connections kept open by each process, and cache duration (in seconds) of the user ids and groups
+    LDAP_POOL_SIZE = 4
+    LDAP_CACHE_TTL = 300
     PROXY_PREFIX = ""
 
+    # Maximum number of files in a single /api/publish/batch request
+    PUBLISH_BATCH_MAX_FILES = 5000
+
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
@@ -51,6 +113,9 @@ class TestingConfig(BaseConfig):
     ADMIN_USERS = ["adminuser"]
     ADMIN_API_KEYS = ["fakeapikey"]
 
+    DOWNLOAD_FLUSH_INTERVAL = 0
+    RESPONSE_CACHE_SHARED = False
+
 
 class ProdConfig(BaseConfig):
     DEBUG = False
@@ -11,12 +11,16 @@ junction_table = Table(
     "file_tag",
     Base.metadata,
     db.Column("file_id", db.ForeignKey('published_file.id'), primary_key=True),
-    db.Column("tag_id", db.ForeignKey('tag.id'), primary_key=True)
+    db.Column("tag_id", db.ForeignKey('tag.id'), primary_key=True),
+    # The primary key covers lookups by file, this one lookups by tag
+    db.Index("ix_file_tag_tag_id_file_id", "tag_id", "file_id")
 )
 
 
 class PublishedFile(db.Model):
     __tablename__ = 'published_file'
+    # Listing order, used for keyset pagination
+    __table_args__ = (db.Index('ix_published_file_publishing_date_id', 'publishing_date', 'id'), )
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True)
     task_id = db.Column(db.String(255), index=True)
     # Maybe store it as text? Or encoded?
@@ -28,6 +32,12 @@ class PublishedFile(db.Model):
     # To check quickly if managed by baricadr
     repo_path = db.Column(db.String(255), index=True, nullable=False)
     hash = db.Column(db.String(255), index=True, default='Computing..')
+    # Additional digests (HASH_ALGORITHMS), as {algorithm: hexdigest}
+    checksums = db.Column(db.JSON())
+    # Hashing progress: bytes hashed, throughput (bytes/s), and hashing state at the last checkpoint (to resume hashing)
+    hashed_size = db.Column(db.BigInteger, default=0)
+    hash_rate = db.Column(db.Float())
+    hash_checkpoints = db.Column(db.JSON())
     status = db.Column(db.String(255), nullable=False, default='creating')
     publishing_date = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
     # Maybe store it as a string? We don't need to run queries on size
@@ -42,8 +52,80 @@ class PublishedFile(db.Model):
         return '<PublishedFile {}>'.format(self.id)
 
 
+class HashCache(db.Model):
+    # Digests of already hashed files, keyed on the file identity (device, inode)
+    # An entry is only valid while size and mtime_ns still match the file on disk
+    __tablename__ = 'hash_cache'
+    __table_args__ = (db.UniqueConstraint('device', 'inode'), )
+    id = db.Column(db.Integer, primary_key=True, unique=True)
+    device = db.Column(db.BigInteger, nullable=False)
+    inode = db.Column(db.BigInteger, nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    mtime_ns = db.Column(db.BigInteger, nullable=False)
+    hash = db.Column(db.String(255), nullable=False)
+    checksums = db.Column(db.JSON())
+    # Number of times the hash was served from the cache / computed for this file
+    hits = db.Column(db.Integer, default=0, nullable=False)
+    misses = db.Column(db.Integer, default=0, nullable=False)
+    # Number of times the entry was found stale (file modified)
+    invalidations = db.Column(db.Integer, default=0, nullable=False, server_default="0")
+    last_hit = db.Column(db.DateTime())
+
+    def __repr__(self):
+        return '<HashCache {}:{}>'.format(self.device, self.inode)
+
+
+class TaskOutbox(db.Model):
+    # Celery tasks recorded in the same transaction as the rows they work on
+    # Removed once sent to the broker
+    __tablename__ = 'task_outbox'
+    id = db.Column(db.Integer, primary_key=True, unique=True)
+    task_name = db.Column(db.String(255), nullable=False)
+    args = db.Column(db.JSON(), nullable=False)
+    creation_date = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return '<TaskOutbox {} {}>'.format(self.id, self.task_name)
+
+
+class DownloadEvent(db.Model):
+    # Raw downloads, consumed by the rollup into DownloadStat
+    # No foreign key: downloads of deleted files are still rolled up
+    __tablename__ = 'download_event'
+    id = db.Column(db.BigInteger, primary_key=True, unique=True)
+    file_id = db.Column(UUID(as_uuid=True), nullable=False)
+    date = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    partial = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        return '<DownloadEvent {} {}>'.format(self.id, self.file_id)
+
+
+class DownloadStat(db.Model):
+    # Downloads per file, per hour or day
+    __tablename__ = 'download_stat'
+    __table_args__ = (
+        db.UniqueConstraint('file_id', 'period', 'bucket'),
+        db.Index('ix_download_stat_period_bucket', 'period', 'bucket'),
+    )
+    id = db.Column(db.Integer, primary_key=True, unique=True)
+    file_id = db.Column(UUID(as_uuid=True), nullable=False)
+    # 'hour' or 'day'
+    period = db.Column(db.String(16), nullable=False)
+    bucket = db.Column(db.DateTime(), nullable=False)
+    downloads = db.Column(db.Integer, nullable=False, default=0)
+    bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    range_requests = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<DownloadStat {} {} {}>'.format(self.file_id, self.period, self.bucket)
+
+
 class Tag(db.Model):
     __tablename__ = 'tag'
+    # Prefix searches (LIKE 'xxx%') cannot use the default index with non-C collations
+    __table_args__ = (db.Index('ix_tag_tag_pattern', 'tag', postgresql_ops={'tag': 'varchar_pattern_ops'}), )
     id = db.Column(db.Integer, primary_key=True, unique=True)
     tag = db.Column(db.String(255), index=True)
 
@@ -1,8 +1,8 @@
-from golink.utils import is_valid_uuid, validate_token
+from golink.utils import is_valid_uuid, redis_error
 
 from functools import wraps
 
-from flask import (jsonify, request, current_app, session)
+from flask import (g, jsonify, make_response, request, current_app)
 
 
 def token_required(f):
@@ -18,11 +18,12 @@ def token_required(f):
             return jsonify({'error': 'Invalid "X-Auth-Token" header: must start with "Bearer "'}), 401
 
         token = auth.split("Bearer ")[-1]
-        user_data = validate_token(token, current_app.config)
+        user_data = current_app.token_cache.validate(token)
         if not user_data['valid']:
             return jsonify({'error': user_data['error']}), 401
 
-        session["user"] = user_data
+        # Per request: storing it in the (cookie) session would send a Set-Cookie header on each response
+        g.user = user_data
         return f(*args, **kwargs)
 
     return decorated_function
@@ -33,8 +34,8 @@ def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         """Login required decorator"""
-        if 'user' in session:
-            if session['user']['is_admin']:
+        if 'user' in g:
+            if g.user['is_admin']:
                 return f(*args, **kwargs)
             return jsonify({"error": True, "errorMessage": "Admin required"}), 401
         return jsonify({"error": True, "errorMessage": "Token required"}), 401
@@ -52,3 +53,40 @@ def is_valid_uid(f):
         return f(file_id, *args, **kwargs)
 
     return decorated_function
+
+
+def cached_response(name):
+    """Serve the response from the response cache if possible, and cache successful responses"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache = current_app.response_cache
+            if not cache.enabled:
+                return f(*args, **kwargs)
+
+            try:
+                # view_args: file_id is passed positionally by is_valid_uid
+                key = cache.make_key(name, request.args, file_id=request.view_args.get("file_id"))
+                cached = cache.get(key)
+            except redis_error() as e:
+                current_app.logger.warning("Response cache unavailable: %s" % str(e))
+                cache.errors += 1
+                return f(*args, **kwargs)
+
+            if cached is not None:
+                response = make_response(cached["body"], 200)
+                response.mimetype = cached["mimetype"]
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                try:
+                    cache.set(key, {"body": response.get_data(as_text=True), "mimetype": response.mimetype})
+                except redis_error():
+                    cache.errors += 1
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return decorated_function
+    return decorator
@@ -0,0 +1,137 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from golink.db_models import DownloadEvent, PublishedFile
+from golink.extensions import db
+from golink.utils import redis_error
+
+from sqlalchemy import bindparam, func
+
+
+DOWNLOADS_KEY = "golink:downloads"
+
+
+class DownloadCounter():
+    """
+    Buffered download counts
+
+    Downloads are counted in memory (or in a redis hash on the broker, shared by all the web processes),
+    and added to published_file.downloads every DOWNLOAD_FLUSH_INTERVAL seconds, with a single
+    'downloads = downloads + n' UPDATE per file. With an interval of 0, counts are written right away.
+
+    Each download is also kept (in memory) as an event, bulk inserted in download_event with the counts,
+    for the statistics rollup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config.get("DOWNLOAD_FLUSH_INTERVAL", 10)
+
+        self.redis = None
+        if app.config.get("DOWNLOAD_COUNTER_BACKEND", "memory") == "redis":
+            import redis
+
+            self.redis = redis.Redis.from_url(app.config["CELERY_BROKER_URL"], socket_timeout=1, socket_connect_timeout=1)
+
+        self._counts = Counter()
+        self._events = []
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def record(self, file_id, size=0, partial=False):
+        """Record a download of size bytes (partial for range requests)"""
+        file_id = str(file_id)
+        event = {"file_id": uuid.UUID(file_id), "date": datetime.utcnow(), "bytes": size, "partial": partial}
+
+        recorded = False
+        if self.redis is not None:
+            try:
+                self.redis.hincrby(DOWNLOADS_KEY, file_id, 1)
+                recorded = True
+            except redis_error() as e:
+                self.app.logger.warning("Could not record download in redis, keeping it in memory: %s" % str(e))
+
+        with self._lock:
+            if not recorded:
+                self._counts[file_id] += 1
+            self._events.append(event)
+
+        if not self.interval:
+            self.flush()
+        else:
+            self._start_flusher()
+
+    def flush(self):
+        """Write the buffered counts to the database, return the number of updated files"""
+        with self._lock:
+            counts = self._counts
+            events = self._events
+            self._counts = Counter()
+            self._events = []
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.hgetall(DOWNLOADS_KEY)
+                pipe.delete(DOWNLOADS_KEY)
+                shared_counts, deleted = pipe.execute()
+                for file_id, count in shared_counts.items():
+                    counts[file_id.decode()] += int(count)
+            except redis_error() as e:
+                self.app.logger.warning("Could not read download counts from redis: %s" % str(e))
+
+        counts = dict((file_id, count) for file_id, count in counts.items() if count)
+        if not (counts or events):
+            return 0
+
+        table = PublishedFile.__table__
+        query = table.update().where(table.c.id == bindparam("file_id")).values(downloads=func.coalesce(table.c.downloads, 0) + bindparam("count"))
+        # Always update rows in the same order, so that concurrent flushes do not deadlock
+        values = [{"file_id": uuid.UUID(file_id), "count": count} for file_id, count in sorted(counts.items())]
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    if values:
+                        connection.execute(query, values)
+                    if events:
+                        connection.execute(DownloadEvent.__table__.insert(), events)
+        except Exception as e:
+            self.app.logger.error("Could not save download counts, will retry: %s" % str(e))
+            with self._lock:
+                self._counts.update(counts)
+                self._events = events + self._events
+            return 0
+
+        return len(counts)
+
+    def _start_flusher(self):
+        # Started on first use (and again in forked processes), not when the app is created
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            if self._flusher_pid is not None:
+                # Forked: the counts inherited from the parent process are flushed by the parent
+                self._counts = Counter()
+                self._events = []
+            self._flusher_pid = pid
+
+        thread = threading.Thread(target=self._flush_loop, name="golink-downloads", daemon=True)
+        thread.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error("Download counts flush failed: %s" % str(e))
@@ -0,0 +1,231 @@
+import hashlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_ALGORITHMS = ("md5",)
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+
+XXHASH_ALGORITHMS = ("xxh32", "xxh64", "xxh3_64", "xxh3_128", "xxh128")
+
+
+def get_hasher(algorithm):
+    """Return a new hash object for the given algorithm name"""
+    algorithm = algorithm.lower()
+    if algorithm in XXHASH_ALGORITHMS:
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError("Hash algorithm '%s' requires the xxhash package" % algorithm)
+        return getattr(xxhash, algorithm)()
+
+    if algorithm not in hashlib.algorithms_available:
+        raise ValueError("Unknown hash algorithm '%s'" % algorithm)
+    return hashlib.new(algorithm)
+
+
+def check_algorithms(algorithms):
+    if not isinstance(algorithms, (list, tuple)) or not algorithms:
+        raise ValueError("HASH_ALGORITHMS must be a non-empty list")
+    for algorithm in algorithms:
+        # Variable length digests (shake_128, shake_256) need a length to be printed
+        if not get_hasher(algorithm).digest_size:
+            raise ValueError("Hash algorithm '%s' has a variable digest length, and cannot be used" % algorithm)
+    return [algorithm.lower() for algorithm in algorithms]
+
+
+def hash_file(path, algorithms=DEFAULT_ALGORITHMS, buffer_size=DEFAULT_BUFFER_SIZE, callback=None, offset=0, length=None, hashers=None):
+    """
+    Compute one or several digests of a file in a single pass.
+
+    Two buffers are allocated once and reused with readinto: while one buffer
+    is being hashed (hashlib releases the GIL on large updates), the next one is
+    read from disk. Each algorithm runs in its own thread, so adding algorithms
+    costs little more wall time than the slowest of them.
+
+    callback, if set, is called with the number of bytes processed after each chunk.
+    offset and length restrict hashing to a part of the file.
+    hashers, if set, is a dict {algorithm: hash object} to update (instead of new hashers for algorithms),
+    to hash a file in several parts.
+    Returns a dict {algorithm: hexdigest}.
+    """
+    if hashers is None:
+        hashers = dict((algorithm.lower(), get_hasher(algorithm)) for algorithm in algorithms)
+
+    buffers = [bytearray(buffer_size), bytearray(buffer_size)]
+    views = [memoryview(buf) for buf in buffers]
+
+    remaining = length
+
+    def read_chunk(f, index):
+        nonlocal remaining
+        if remaining is None:
+            return f.readinto(buffers[index])
+        if not remaining:
+            return 0
+        read = f.readinto(views[index][:min(buffer_size, remaining)])
+        remaining -= read
+        return read
+
+    with ThreadPoolExecutor(max_workers=len(hashers)) as pool, open(path, "rb", buffering=0) as f:
+        if offset:
+            f.seek(offset)
+        pending = []
+        current = 0
+        read = read_chunk(f, current)
+        while read:
+            chunk = views[current][:read]
+            pending = [pool.submit(hasher.update, chunk) for hasher in hashers.values()]
+
+            # Read the next chunk while the current one is being hashed
+            current = 1 - current
+            next_read = read_chunk(f, current)
+
+            for future in pending:
+                future.result()
+            if callback:
+                callback(read)
+            read = next_read
+
+    return dict((algorithm, hasher.hexdigest()) for algorithm, hasher in hashers.items())
+
+
+class ResumableHash():
+    """
+    Hash object whose state can be exported, and restored in another process (to resume hashing a file)
+
+    hashlib cannot export its state: this uses the low-level digest functions of OpenSSL (libcrypto)
+    through ctypes, which releases the GIL as hashlib does. States are plain copies of the OpenSSL
+    contexts, only valid with the same OpenSSL version and architecture (see resumable_backend).
+    """
+
+    def __init__(self, algorithm, state=None):
+        self.algorithm = algorithm
+        self._functions = _get_openssl_functions(algorithm)
+        if self._functions is None:
+            raise ValueError("Hash algorithm '%s' cannot be resumed" % algorithm)
+
+        self._ctx = _new_context()
+        if state is None:
+            self._functions["init"](self._ctx)
+        else:
+            import ctypes
+
+            state = bytes.fromhex(state)
+            if len(state) != self._functions["context_size"]:
+                raise ValueError("Invalid %s hashing state" % algorithm)
+            ctypes.memmove(self._ctx, state, len(state))
+
+    def update(self, data):
+        import ctypes
+
+        data = memoryview(data)
+        if data.readonly:
+            data = memoryview(bytearray(data))
+        if len(data):
+            self._functions["update"](self._ctx, (ctypes.c_char * len(data)).from_buffer(data), len(data))
+
+    def get_state(self):
+        import ctypes
+
+        return ctypes.string_at(self._ctx, self._functions["context_size"]).hex()
+
+    def hexdigest(self):
+        import ctypes
+
+        # Finalize a copy, so that the hash can still be updated
+        ctx = _new_context()
+        ctypes.memmove(ctx, self._ctx, self._functions["context_size"])
+        digest = ctypes.create_string_buffer(self._functions["digest_size"])
+        self._functions["final"](digest, ctx)
+        return digest.raw.hex()
+
+
+# OpenSSL function prefix, context size and digest size
+OPENSSL_DIGESTS = {
+    "md5": ("MD5", 92, 16),
+    "sha1": ("SHA1", 96, 20),
+    "sha224": ("SHA224", 112, 28),
+    "sha256": ("SHA256", 112, 32),
+    "sha384": ("SHA384", 216, 48),
+    "sha512": ("SHA512", 216, 64)
+}
+
+_openssl = {}
+
+
+def _new_context():
+    import ctypes
+
+    # Large and aligned enough for all the OpenSSL contexts
+    return (ctypes.c_uint64 * 64)()
+
+
+def _load_libcrypto():
+    if "lib" not in _openssl:
+        import ctypes
+        import ctypes.util
+
+        _openssl["lib"] = None
+        name = ctypes.util.find_library("crypto")
+        if name:
+            try:
+                _openssl["lib"] = ctypes.CDLL(name)
+            except OSError:
+                pass
+    return _openssl["lib"]
+
+
+def _get_openssl_functions(algorithm):
+    if algorithm not in OPENSSL_DIGESTS:
+        return None
+    if algorithm in _openssl:
+        return _openssl[algorithm]
+
+    import ctypes
+
+    lib = _load_libcrypto()
+    prefix, context_size, digest_size = OPENSSL_DIGESTS[algorithm]
+    functions = None
+    try:
+        functions = {
+            "init": getattr(lib, prefix + "_Init"),
+            "update": getattr(lib, prefix + "_Update"),
+            "final": getattr(lib, prefix + "_Final"),
+            "context_size": context_size,
+            "digest_size": digest_size
+        }
+        functions["update"].argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t]
+    except AttributeError:
+        # No libcrypto, or built without the deprecated low-level functions
+        functions = None
+
+    _openssl[algorithm] = functions
+    if functions is not None and not _self_test(algorithm):
+        _openssl[algorithm] = None
+    return _openssl[algorithm]
+
+
+def _self_test(algorithm):
+    # Check that the context layout is the expected one, through an export and a restore
+    data = bytes(range(256)) * 3
+    hasher = ResumableHash(algorithm)
+    hasher.update(data[:200])
+    hasher = ResumableHash(algorithm, state=hasher.get_state())
+    hasher.update(data[200:])
+    return hasher.hexdigest() == hashlib.new(algorithm, data).hexdigest()
+
+
+def is_resumable(algorithm):
+    return _get_openssl_functions(algorithm.lower()) is not None
+
+
+def resumable_backend():
+    """Identifier of the implementation of ResumableHash: saved states can only be restored with the same one"""
+    import sys
+
+    lib = _load_libcrypto()
+    version = getattr(lib, "OpenSSL_version_num", None) or getattr(lib, "SSLeay", None)
+    if version is None:
+        return None
+    return "openssl-%x-%s" % (version(), sys.byteorder)
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+# Resolved user, shared by all the requests of the user: immutable
+UserIdentity = namedtuple("UserIdentity", ["username", "user_id", "dn", "group_names", "group_ids", "groups", "error"])
+
+
+class LdapClient():
+    """
+    Access to the LDAP, with a pool of bound connections and a cache of user data
+
+    LDAP_HOST can list several hosts (comma separated), used in turn. Connections are opened on first use,
+    reused by the following requests (at most LDAP_POOL_SIZE are kept) and reconnect by themselves.
+    Connections and requests time out after LDAP_TIMEOUT seconds.
+    User ids and groups are cached for LDAP_CACHE_TTL seconds, so repeated publications by the same
+    user do not query the LDAP. Passwords are always checked against the LDAP.
+
+    ldap3 is only imported on first use (celery workers never use the LDAP).
+    """
+
+    def __init__(self, config, client_strategy="RESTARTABLE"):
+        self.base_query = config.get("LDAP_BASE_QUERY")
+        self.cache_ttl = config.get("LDAP_CACHE_TTL", 300)
+        self.client_strategy = client_strategy
+        self.timeout = config.get("LDAP_TIMEOUT", 5)
+        self.hosts = [host.strip() for host in (config.get("LDAP_HOST") or "").split(",") if host.strip()]
+        self.port = config.get("LDAP_PORT") or 389
+        self._server = None
+
+        self.hits = 0
+        self.misses = 0
+        self._users = {}
+        self._users_lock = threading.Lock()
+        self._pool = queue.LifoQueue(maxsize=config.get("LDAP_POOL_SIZE", 4))
+
+    @property
+    def server(self):
+        if self._server is None:
+            from ldap3 import NONE, ROUND_ROBIN, Server, ServerPool
+
+            servers = [Server(host, self.port, get_info=NONE, connect_timeout=self.timeout) for host in self.hosts]
+            if len(servers) > 1:
+                self._server = ServerPool(servers, ROUND_ROBIN, active=True, exhaust=60)
+            elif servers:
+                self._server = servers[0]
+        return self._server
+
+    def _connect(self, user=None, password=None):
+        from ldap3 import Connection
+        from ldap3.core.exceptions import LDAPBindError
+
+        conn = Connection(self.server, user=user, password=password, client_strategy=self.client_strategy, receive_timeout=self.timeout)
+        if not conn.bind():
+            raise LDAPBindError(conn.last_error)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a bound connection from the pool"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            yield conn
+        except Exception:
+            # The connection state is unknown, do not reuse it
+            conn.unbind()
+            raise
+
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.unbind()
+
+    def check(self):
+        with self.connection() as conn:
+            return bool(conn.bound)
+
+    def get_identity(self, username):
+        """
+        Return the UserIdentity of a user (from the cache if possible)
+        """
+        with self._users_lock:
+            cached = self._users.get(username)
+            if cached is not None and cached[1] > time.monotonic():
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        from ldap3.utils.conv import escape_filter_chars
+
+        with self.connection() as conn:
+            if not conn.search(self.base_query, '(uid=%s)' % escape_filter_chars(username), attributes=['uidNumber'], size_limit=1, time_limit=10):
+                return UserIdentity(username, None, None, (), (), frozenset(), "Could not find user %s in LDAP" % username)
+            user = conn.entries[0]
+
+            conn.search(self.base_query, '(memberuid=%s)' % escape_filter_chars(username), attributes=['gidNumber', 'cn'], time_limit=10)
+            group_names = tuple(group['cn'][0] for group in conn.entries)
+            group_ids = tuple(group['gidNumber'][0] for group in conn.entries)
+
+        identity = UserIdentity(
+            username=username,
+            user_id=str(user['uidNumber'].values[0]),
+            dn=user.entry_dn,
+            group_names=group_names,
+            group_ids=group_ids,
+            # Repositories ACLs mix group names and ids
+            groups=frozenset(str(group) for group in group_names + group_ids),
+            error=None
+        )
+
+        # Unknown users are not cached: they may be created in the meantime
+        with self._users_lock:
+            self._users[username] = (identity, time.monotonic() + self.cache_ttl)
+            # Drop the expired entries from time to time
+            if len(self._users) > 1000:
+                now = time.monotonic()
+                self._users = dict((key, value) for key, value in self._users.items() if value[1] > now)
+
+        return identity
+
+    def get_user_data(self, username):
+        """
+        Return {"user_id", "user_group_names", "user_group_ids", "error"} for a user (from the cache if possible)
+        """
+        identity = self.get_identity(username)
+        return {
+            "user_id": identity.user_id,
+            "user_group_names": list(identity.group_names),
+            "user_group_ids": list(identity.group_ids),
+            "error": identity.error
+        }
+
+    def authenticate(self, username, password):
+        if not password:
+            # An empty password would be an anonymous bind, which succeeds
+            return False
+
+        identity = self.get_identity(username)
+        if identity.error:
+            return False
+
+        from ldap3.core.exceptions import LDAPBindError
+
+        try:
+            conn = self._connect(user=identity.dn, password=password)
+        except LDAPBindError:
+            return False
+        conn.unbind()
+        return True
+
+    def clear_cache(self):
+        with self._users_lock:
+            self._users = {}
@@ -0,0 +1,78 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from golink.cache import FILE_LISTINGS
+from golink.db_models import PublishedFile
+from golink.extensions import db
+
+
+# Statuses depending on the presence of the file on disk
+SCANNED_STATUSES = ("available", "unavailable", "pullable", "pulling")
+
+
+def _file_size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
+def _new_status(datafile, size, has_baricadr):
+    if size is not None:
+        # We don't know the status of Baricadr, so, check the size for completion
+        if datafile.status == "pulling" and size != datafile.size:
+            return None
+        return "available" if datafile.status != "available" else None
+
+    if datafile.status == "available":
+        return "pullable" if has_baricadr else "unavailable"
+    return None
+
+
+def scan_availability(batch_size=1000, threads=8):
+    """
+    Update the status of published files according to their presence on disk
+
+    Files are checked in batches, with several stat calls in parallel (repositories are usually on network filesystems).
+    Returns {new status: number of files updated}
+    """
+    updated = defaultdict(int)
+    updated_ids = []
+    last_id = None
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        while True:
+            query = db.session.query(PublishedFile.id, PublishedFile.file_path, PublishedFile.repo_path, PublishedFile.status, PublishedFile.size) \
+                .filter(PublishedFile.status.in_(SCANNED_STATUSES))
+            if last_id is not None:
+                query = query.filter(PublishedFile.id > last_id)
+            files = query.order_by(PublishedFile.id).limit(batch_size).all()
+            if not files:
+                break
+            last_id = files[-1].id
+
+            changes = defaultdict(list)
+            for datafile, size in zip(files, pool.map(_file_size, [datafile.file_path for datafile in files])):
+                repo = current_app.repos.get_repo(datafile.repo_path)
+                status = _new_status(datafile, size, repo.has_baricadr if repo else False)
+                if status:
+                    changes[(datafile.status, status)].append(datafile.id)
+
+            for (old_status, status), file_ids in changes.items():
+                # Only update files whose status did not change in the meantime
+                count = PublishedFile.query.filter(PublishedFile.id.in_(file_ids), PublishedFile.status == old_status) \
+                    .update({PublishedFile.status: status}, synchronize_session=False)
+                updated[status] += count
+                updated_ids.extend(file_ids)
+            db.session.commit()
+
+            if len(files) < batch_size:
+                break
+
+    if updated_ids:
+        current_app.response_cache.invalidate_files(updated_ids, listings=FILE_LISTINGS)
+
+    return dict(updated)
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from golink.db_models import HashCache
+from golink.extensions import db
+
+from sqlalchemy.exc import IntegrityError
+
+
+def _signed64(value):
+    # st_dev and st_ino are unsigned 64 bits integers, postgres bigint is signed
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def get_cached_hash(file_stat, algorithms):
+    """
+    Return the cache entry matching a file stat, or None
+
+    A stale entry (same device/inode, but different size or mtime) is kept with its counters,
+    and updated by store_hash once the file is hashed again.
+    An entry missing one of the requested algorithms is not used.
+    """
+    entry = HashCache.query.filter_by(device=_signed64(file_stat.st_dev), inode=_signed64(file_stat.st_ino)).first()
+    if not entry:
+        return None
+
+    if not (entry.size == file_stat.st_size and entry.mtime_ns == file_stat.st_mtime_ns):
+        HashCache.query.filter_by(id=entry.id).update({HashCache.invalidations: HashCache.invalidations + 1}, synchronize_session=False)
+        db.session.commit()
+        return None
+
+    checksums = entry.checksums or {}
+    if any(algorithm not in checksums for algorithm in algorithms if algorithm != "md5"):
+        return None
+
+    HashCache.query.filter_by(id=entry.id).update({HashCache.hits: HashCache.hits + 1, HashCache.last_hit: datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return entry
+
+
+def store_hash(file_stat, digests):
+    """
+    Record the digests computed for a file
+
+    digests is the {algorithm: hexdigest} dict returned by golink.hashing.hash_file
+    """
+    checksums = dict((algorithm, digest) for algorithm, digest in digests.items() if algorithm != "md5")
+    device = _signed64(file_stat.st_dev)
+    inode = _signed64(file_stat.st_ino)
+
+    entry = HashCache.query.filter_by(device=device, inode=inode).first()
+    if not entry:
+        entry = HashCache(device=device, inode=inode, hits=0, misses=0, invalidations=0)
+        db.session.add(entry)
+
+    entry.size = file_stat.st_size
+    entry.mtime_ns = file_stat.st_mtime_ns
+    entry.hash = digests["md5"]
+    entry.checksums = checksums or None
+    entry.misses = entry.misses + 1
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another task stored the same file in the meantime
+        db.session.rollback()
+
+
+def get_hash_cache_stats():
+    hits, misses, invalidations, entries = db.session.query(
+        db.func.coalesce(db.func.sum(HashCache.hits), 0),
+        db.func.coalesce(db.func.sum(HashCache.misses), 0),
+        db.func.coalesce(db.func.sum(HashCache.invalidations), 0),
+        db.func.count(HashCache.id)
+    ).one()
+    return {"entries": entries, "hits": int(hits), "misses": int(misses), "invalidations": int(invalidations)}
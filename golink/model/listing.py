@@ -0,0 +1,165 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from golink.db_models import PublishedFile, Tag, junction_table
+from golink.extensions import db
+
+from sqlalchemy import desc, distinct, func, tuple_
+
+
+COUNT_MODES = ("exact", "estimate", "none")
+CURSOR_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def encode_cursor(datafile):
+    """Opaque pagination token pointing after the given file"""
+    value = json.dumps([datafile.publishing_date.strftime(CURSOR_DATE_FORMAT), str(datafile.id)])
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        publishing_date, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return datetime.strptime(publishing_date, CURSOR_DATE_FORMAT), uuid.UUID(file_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_pagination(args):
+    """
+    Read the pagination parameters of a listing request
+
+    offset/limit is kept for compatibility, cursor (the 'next' value of the previous page) should be preferred:
+    its cost does not depend on the page depth.
+    count is one of 'exact' (default without a cursor), 'estimate' (planner estimate) and 'none' (default with a cursor).
+    """
+    try:
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        offset = 0
+
+    try:
+        limit = int(args.get('limit', 10))
+    except ValueError:
+        limit = 0
+
+    cursor = args.get('cursor')
+    if cursor:
+        cursor = decode_cursor(cursor)
+
+    count = args.get('count', 'none' if cursor else 'exact')
+    if count not in COUNT_MODES:
+        raise ValueError("count must be one of %s" % ", ".join(COUNT_MODES))
+
+    return {"offset": offset, "limit": limit, "cursor": cursor, "count": count}
+
+
+def parse_tag_filters(args):
+    """
+    Read the tag filters of a listing request
+
+    'tags' are all required (AND), files must have at least one of 'any_tags' (OR) and none of 'not_tags' (NOT)
+    """
+    filters = {}
+    for key in ("tags", "any_tags", "not_tags"):
+        values = args.getlist(key) or args.getlist(key + "[]")
+        filters[key] = sorted(set(value.strip().lower() for value in values if value.strip()))
+    return filters
+
+
+def _tagged_files(tag_names):
+    return db.session.query(junction_table.c.file_id) \
+        .join(Tag, Tag.id == junction_table.c.tag_id) \
+        .filter(Tag.tag.in_(tag_names))
+
+
+def filter_tags(query, tags=[], any_tags=[], not_tags=[]):
+    """
+    Restrict a PublishedFile query with tag filters (see parse_tag_filters)
+
+    Each filter is a single uncorrelated subquery on file_tag, whatever the number of tags.
+    Requiring an unknown tag matches no file.
+    """
+    if tags:
+        # A file has all the tags if it matches as many distinct names
+        query = query.filter(PublishedFile.id.in_(
+            _tagged_files(tags).group_by(junction_table.c.file_id).having(func.count(distinct(Tag.tag)) == len(tags)).subquery()
+        ))
+    if any_tags:
+        query = query.filter(PublishedFile.id.in_(_tagged_files(any_tags).subquery()))
+    if not_tags:
+        query = query.filter(~PublishedFile.id.in_(_tagged_files(not_tags).subquery()))
+    return query
+
+
+def paginate(query, offset=0, limit=10, cursor=None, count="exact", order_by=None):
+    """
+    Return a page of a PublishedFile query, ordered by publishing date (newest first)
+
+    order_by, if set, is a list of clauses to sort on before the publishing date.
+    Cursors only follow the publishing date order: with order_by, use offset.
+    Returns (files, next cursor or None, total or None)
+    """
+    if cursor and order_by:
+        raise ValueError("cursor can only be used with the default sort")
+
+    total = None
+    if count == "exact":
+        total = query.order_by(None).count()
+    elif count == "estimate":
+        total = estimate_count(query)
+
+    query = query.order_by(*(order_by or []), desc(PublishedFile.publishing_date), desc(PublishedFile.id))
+    if cursor:
+        query = query.filter(tuple_(PublishedFile.publishing_date, PublishedFile.id) < tuple_(*cursor))
+    elif offset:
+        query = query.offset(offset)
+
+    # Fetch one more row to know if there is a next page
+    files = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(files) > limit:
+        files = files[:limit]
+        if files and not order_by:
+            next_cursor = encode_cursor(files[-1])
+
+    return files, next_cursor, total
+
+
+def estimate_count(query):
+    """Row count estimated by the postgres planner (exact count with other databases)"""
+    if db.engine.dialect.name != "postgresql":
+        return query.order_by(None).count()
+
+    statement = query.order_by(None).statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection().execute("EXPLAIN (FORMAT JSON) " + str(statement), statement.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def get_page_tags(files):
+    """
+    Load the tags of a page of files with a single query
+
+    Returns ({file_id: [tag names]}, [{"tag": name, "count": number of files of the page with this tag}])
+    """
+    file_tags = dict((file.id, []) for file in files)
+    if not file_tags:
+        return file_tags, []
+
+    tag_count = func.count().over(partition_by=Tag.tag)
+    rows = db.session.query(junction_table.c.file_id, Tag.tag, tag_count) \
+        .join(Tag, Tag.id == junction_table.c.tag_id) \
+        .filter(junction_table.c.file_id.in_(list(file_tags))) \
+        .order_by(Tag.tag)
+
+    facet = {}
+    for file_id, tag, count in rows:
+        file_tags[file_id].append(tag)
+        facet[tag] = count
+
+    return file_tags, [{"tag": tag, "count": count} for tag, count in facet.items()]
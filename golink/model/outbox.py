@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from celery import group
+
+from flask import current_app
+
+from golink.db_models import TaskOutbox
+from golink.extensions import db
+
+from sqlalchemy import event
+
+
+PENDING_KEY = "golink_outbox_pending"
+READY_KEY = "golink_outbox_ready"
+
+
+def enqueue_task(task_name, args):
+    """
+    Record a Celery task in the current transaction
+
+    The task is sent to the broker once the transaction is committed, and dropped if it is rolled back.
+    If sending fails (or the process dies in between), it stays in the outbox until dispatch_outbox picks it up.
+    """
+    entry = TaskOutbox(task_name=task_name, args=list(args))
+    db.session.add(entry)
+    db.session.info.setdefault(PENDING_KEY, []).append(entry)
+    return entry
+
+
+def dispatch_outbox(min_age=0, limit=1000):
+    """
+    Send the tasks left in the outbox for more than min_age seconds
+    """
+    max_date = datetime.utcnow() - timedelta(seconds=min_age)
+    entries = TaskOutbox.query.filter(TaskOutbox.creation_date <= max_date).order_by(TaskOutbox.id).with_for_update(skip_locked=True).limit(limit).all()
+
+    sent = 0
+    for entry in entries:
+        try:
+            current_app.celery.send_task(entry.task_name, entry.args)
+        except Exception as e:
+            current_app.logger.error("Could not send task %s (outbox entry %s): %s" % (entry.task_name, entry.id, str(e)))
+            break
+        db.session.delete(entry)
+        sent += 1
+
+    db.session.commit()
+    return sent
+
+
+def _send_tasks(entries):
+    celery = current_app.celery
+    try:
+        if len(entries) > 1:
+            # Send all the tasks of the transaction with a single producer
+            group(celery.signature(task_name, args=args) for entry_id, task_name, args in entries).apply_async()
+        else:
+            entry_id, task_name, args = entries[0]
+            celery.send_task(task_name, args)
+    except Exception as e:
+        current_app.logger.error("Could not send %s tasks, they will be retried later: %s" % (len(entries), str(e)))
+        return
+
+    # The session cannot emit SQL in after_commit, use a separate connection
+    with db.engine.begin() as connection:
+        connection.execute(TaskOutbox.__table__.delete().where(TaskOutbox.id.in_([entry[0] for entry in entries])))
+
+
+@event.listens_for(db.session, "before_commit")
+def _collect_outbox(session):
+    entries = session.info.pop(PENDING_KEY, None)
+    if entries:
+        # Make sure ids are assigned before the commit expires the instances
+        session.flush()
+        session.info.setdefault(READY_KEY, []).extend([(entry.id, entry.task_name, entry.args) for entry in entries])
+
+
+@event.listens_for(db.session, "after_commit")
+def _dispatch_outbox(session):
+    entries = session.info.pop(READY_KEY, None)
+    if entries:
+        _send_tasks(entries)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _clear_outbox(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(READY_KEY, None)
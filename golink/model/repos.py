@@ -1,10 +1,13 @@
 import os
+import threading
+import time
 
 from flask import current_app
 
-from golink.db_models import PublishedFile, Tag
+from golink.db_models import PublishedFile
 from golink.extensions import db
-from golink.utils import get_user_ldap_data
+from golink.model.outbox import enqueue_task
+from golink.model.tags import get_or_create_tags
 
 import yaml
 
@@ -16,9 +19,7 @@ class Repo():
         self.local_path = local_path  # No trailing slash
         self.conf = conf
 
-        self.has_baricadr = False
-        if current_app.baricadr_enabled and 'has_baricadr' in conf and conf['has_baricadr'] is True:
-            self.has_baricadr = True
+        self.use_baricadr = conf.get('has_baricadr') is True
 
         self.allowed_groups = conf.get("allowed_groups", [])
         if not type(self.allowed_groups) == list:
@@ -28,56 +29,55 @@ class Repo():
         if not type(self.allowed_users) == list:
             raise ValueError("allowed_users for path '%s' is not a list" % local_path)
 
+        # Compiled ACL: users are names or uids, groups are names or gids (compared as strings)
+        self.acl_users = frozenset(str(user) for user in self.allowed_users)
+        self.acl_groups = frozenset(str(group) for group in self.allowed_groups)
+        # Without both users and groups restrictions, owners of a file can publish it
+        self.owner_can_publish = not (self.allowed_users and self.allowed_groups)
+
+    @property
+    def has_baricadr(self):
+        # Baricadr availability is checked in the background, and can change
+        probe = current_app.probes.get("baricadr")
+        return self.use_baricadr and probe is not None and bool(probe.get())
+
     def is_in_repo(self, path):
         path = os.path.join(path, "")
         return path.startswith(os.path.join(self.local_path, ""))
 
-    def check_publish_file(self, file_path, user_data):
+    def acl_allows(self, identity):
+        """Whether the users and groups of the repository include a (golink.ldap_client.UserIdentity) user"""
+        if identity.username in self.acl_users or identity.user_id in self.acl_users:
+            return True
+        return not self.acl_groups.isdisjoint(identity.groups)
+
+    def owns_file(self, identity, file_path):
+        """Whether the user can publish file_path as its owner (only checked when the ACL does not allow it)"""
+        return self.owner_can_publish and str(os.stat(file_path).st_uid) == identity.user_id
+
+    def check_publish_file(self, file_path, user_data, identity=None):
         username = user_data["username"]
         is_admin = user_data["is_admin"]
 
         if not os.path.exists(file_path):
             return {"available": False, "error": "Target file %s does not exists" % file_path}
 
-        file_name = os.path.basename(file_path)
-        name, ext = os.path.splitext(file_name)
-
-        # Check is user is in allowed groups
-        # Check if user is in allowed users
-        # If no allowed groups and no allowed_users: check if is owner
-
         if current_app.config['GOLINK_RUN_MODE'] == "prod":
-            user_data = get_user_ldap_data(username, current_app.config)
-
-            if user_data["error"]:
-                return {"available": False, "error": "%s" % user_data["error"]}
-
-            has_access = False
+            # identity can be passed when checking several files for the same user
+            if identity is None:
+                identity = current_app.ldap_client.get_identity(username)
 
-            if is_admin:
-                has_access = True
+            if identity.error:
+                return {"available": False, "error": "%s" % identity.error}
 
-            if (set(self.allowed_groups) & set(user_data["user_group_ids"])):
-                has_access = True
-            if (set(self.allowed_groups) & set(user_data["user_group_names"])):
-                has_access = True
-
-            if username in self.allowed_users:
-                has_access = True
-            if user_data['user_id'] in self.allowed_users:
-                has_access = True
-
-            # If no restriction on user and groups, check is owner
-            if not (self.allowed_users and self.allowed_groups) and str(os.stat(file_path).st_uid) == user_data['user_id']:
-                has_access = True
-
-            if not has_access:
+            if not (is_admin or self.acl_allows(identity) or self.owns_file(identity, file_path)):
                 return {"available": False, "error": "User %s does not have permission to publish this file on this repository" % username}
             # Should we have a contact email in this case?
 
         return {"available": True, "error": ""}
 
-    def publish_file(self, file_path, user_data, version=1, email="", contact="", linked_to=None, tags=set()):
+    def create_published_file(self, file_path, user_data, version=1, contact="", linked_to=None, tags=[]):
+        # Add a PublishedFile to the session, without committing. tags is a list of Tag entities
         username = user_data["username"]
 
         # Send task to copy file
@@ -87,23 +87,19 @@ class Repo():
 
         pf = PublishedFile(file_name=file_name, file_path=file_path, repo_path=self.local_path, version=version, owner=username, size=size, version_of=linked_to)
         if tags:
-            missing_tag = False
-            tag_list = []
-            for tag in tags:
-                tag_entity = Tag.query.filter_by(tag=tag).first()
-                if not tag_entity:
-                    missing_tag = True
-                    tag_entity = Tag(tag=tag)
-                    db.session.add(tag_entity)
-                tag_list.append(tag_entity)
-            if missing_tag:
-                db.session.commit()
-            pf.tags = tag_list
+            pf.tags = list(tags)
         if contact:
             pf.contact = contact
         db.session.add(pf)
+        return pf
+
+    def publish_file(self, file_path, user_data, version=1, email="", contact="", linked_to=None, tags=set()):
+        tag_list = get_or_create_tags(tags).values()
+        pf = self.create_published_file(file_path, user_data, version=version, contact=contact, linked_to=linked_to, tags=tag_list)
+        db.session.flush()
+        # Sent to the broker only once the file is committed
+        enqueue_task("publish", (str(pf.id), file_path, email))
         db.session.commit()
-        current_app.celery.send_task("publish", (pf.id, file_path, email))
         return pf.id
 
     def list_files(self):
@@ -115,26 +111,157 @@ class Repo():
         return path[len(self.local_path) + 1:]
 
 
+class RepoIndex():
+    """
+    Repositories indexed by their path components (a trie), to find the repository containing a path in O(depth)
+
+    Each node is a dict of child components, the repository of a node (if any) is stored under the None key.
+    """
+
+    def __init__(self):
+        self.repos = {}
+        self._root = {}
+
+    def _components(self, path):
+        return [part for part in path.split("/") if part]
+
+    def add(self, repo):
+        """Add a repository, raising a ValueError if it overlaps a known one"""
+        if repo.local_path in self.repos:
+            raise ValueError('Could not load duplicate repository for path "%s"' % repo.local_path)
+
+        node = self._root
+        for part in self._components(repo.local_path):
+            if None in node:
+                break
+            node = node.setdefault(part, {})
+
+        known = node.get(None) or self._first_repo(node)
+        if known:
+            raise ValueError('Could not load repository for path "%s", conflicting with "%s"' % (repo.local_path, known.local_path))
+
+        node[None] = repo
+        self.repos[repo.local_path] = repo
+
+    def _first_repo(self, node):
+        # Any repository below this node
+        while node:
+            if None in node:
+                return node[None]
+            node = next(iter(node.values()))
+        return None
+
+    def find(self, path):
+        """Return the repository containing path, or None"""
+        node = self._root
+        repo = node.get(None)
+        for part in self._components(path):
+            node = node.get(part)
+            if node is None:
+                break
+            repo = node.get(None, repo)
+        return repo
+
+
 class Repos():
+    """
+    The configured repositories, reloaded when the configuration file changes
 
-    def __init__(self, config_file):
+    The file is checked at most every reload_interval seconds (0 to disable), when a repository is looked up.
+    A new index is fully built and validated before replacing the current one (a single attribute assignment),
+    so readers never see a partial index and never wait: while a thread reloads, the others use the previous index.
+    If the new configuration is invalid, the previous index is kept.
+    """
+
+    def __init__(self, config_file, reload_interval=0):
 
         self.config_file = config_file
+        self.reload_interval = reload_interval
+
+        self.generation = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error = None
+        self._file_state = None
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
 
         self.read_conf(config_file)
 
+    @property
+    def repos(self):
+        return self.index.repos
+
+    def _get_file_state(self, path):
+        # The inode changes when the file is replaced (by a rename, or a symlink swap with configmaps)
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
     def read_conf(self, path):
 
+        file_state = self._get_file_state(path)
         with open(path, 'r') as stream:
-            self.repos = self.do_read_conf(stream.read())
+            self._set_index(self.do_read_conf(stream.read()))
+        self._file_state = file_state
 
     def read_conf_from_str(self, content):
 
-        self.repos = self.do_read_conf(content)
+        self._set_index(self.do_read_conf(content))
+
+    def _set_index(self, index):
+        self.index = index
+        self.generation += 1
+
+    def reload_if_changed(self, force=False):
+        """
+        Reload the configuration file if it changed since the last load. Returns True if it was reloaded
+        """
+        if not force:
+            if not self.reload_interval or time.monotonic() - self._checked_at < self.reload_interval:
+                return False
+
+        # Only one thread checks the file, the others keep using the current index
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._checked_at = time.monotonic()
+            try:
+                if self._get_file_state(self.config_file) == self._file_state:
+                    return False
+                self.read_conf(self.config_file)
+            except Exception as e:
+                self.reload_errors += 1
+                self.last_error = str(e)
+                current_app.logger.error("Could not reload the repositories from %s, keeping the previous ones: %s" % (self.config_file, str(e)))
+                # Do not retry until the file changes again
+                try:
+                    self._file_state = self._get_file_state(self.config_file)
+                except OSError:
+                    pass
+                return False
+
+            self.reloads += 1
+            self.last_error = None
+            current_app.logger.info("Reloaded %s repositories from %s (generation %s)" % (len(self.repos), self.config_file, self.generation))
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def stats(self):
+        return {
+            'config_file': self.config_file,
+            'repositories': len(self.repos),
+            'generation': self.generation,
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+            'last_error': self.last_error
+        }
 
     def do_read_conf(self, content):
+        """Load a repositories definition, and return a RepoIndex"""
 
-        repos = {}
+        index = RepoIndex()
         repos_conf = yaml.safe_load(content)
         if not repos_conf:
             raise ValueError("Malformed repository definition '%s'" % content)
@@ -145,40 +272,12 @@ class Repos():
             if not os.path.exists(repo_abs):
                 current_app.logger.warning("Directory '%s' does not exist, creating it" % repo_abs)
                 os.makedirs(repo_abs)
-            if repo_abs in repos:
-                raise ValueError('Could not load duplicate repository for path "%s"' % repo_abs)
 
-            for known in repos:
-                if self._is_subdir_of(repo_abs, known):
-                    raise ValueError('Could not load repository for path "%s", conflicting with "%s"' % (repo_abs, known))
+            index.add(Repo(repo_abs, repos_conf[repo]))
 
-            repos[repo_abs] = Repo(repo_abs, repos_conf[repo])
-
-        return repos
-
-    def _is_subdir_of(self, path1, path2):
-
-        path1 = os.path.join(path1, "")
-        path2 = os.path.join(path2, "")
-
-        if path1 == path2:
-            return True
-
-        if len(path1) > len(path2):
-            if path2 == path1[:len(path2)]:
-                return True
-        elif len(path1) < len(path2):
-            if path1 == path2[:len(path1)]:
-                return True
-
-        return False
+        return index
 
     def get_repo(self, path):
 
-        path = os.path.join(path, "")
-
-        for repo in self.repos:
-            if self.repos[repo].is_in_repo(path):
-                return self.repos[repo]
-
-        return False
+        self.reload_if_changed()
+        return self.index.find(path) or False
@@ -0,0 +1,53 @@
+from golink.db_models import PublishedFile
+from golink.extensions import db
+
+from sqlalchemy import case, func
+
+
+MATCH_MODES = ("contains", "prefix")
+SORT_MODES = ("date", "relevance")
+
+# Whether pg_trgm is installed, per database
+_trigram_support = {}
+
+
+def has_trigram_support():
+    """
+    Check (once per database) if the pg_trgm extension is installed
+
+    The trigram index (see migrations) serves both LIKE filters and similarity ranking.
+    """
+    engine = db.engine
+    if engine.dialect.name != "postgresql":
+        return False
+
+    key = str(engine.url)
+    if key not in _trigram_support:
+        _trigram_support[key] = bool(db.session.execute("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'").scalar())
+    return _trigram_support[key]
+
+
+def filter_file_name(query, term, match="contains"):
+    """
+    Restrict a PublishedFile query to the files whose name contains (or starts with) term, case-insensitively
+
+    On postgres, both are served by the trigram index on lower(file_name)
+    """
+    file_name = func.lower(PublishedFile.file_name)
+    term = term.lower()
+    if match == "prefix":
+        return query.filter(file_name.startswith(term, autoescape=True))
+    return query.filter(file_name.contains(term, autoescape=True))
+
+
+def relevance_order(term):
+    """
+    Ordering clauses for the best matches of term first
+
+    Trigram similarity with pg_trgm, otherwise prefix matches first, then shortest names.
+    """
+    file_name = func.lower(PublishedFile.file_name)
+    term = term.lower()
+    if has_trigram_support():
+        return [func.similarity(file_name, term).desc()]
+    return [case([(file_name.startswith(term, autoescape=True), 0)], else_=1), func.length(PublishedFile.file_name)]
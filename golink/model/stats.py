@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from golink.db_models import DownloadStat, PublishedFile
+from golink.extensions import db
+
+from sqlalchemy import desc, func, text
+
+
+PERIODS = ("hour", "day")
+
+# Consume a batch of events, and add them to the hourly and daily buckets, in a single statement
+ROLLUP_QUERY = text("""
+WITH consumed AS (
+    DELETE FROM download_event WHERE id IN (
+        SELECT id FROM download_event ORDER BY id LIMIT :batch_size FOR UPDATE SKIP LOCKED
+    )
+    RETURNING file_id, date, bytes, partial
+), buckets AS (
+    SELECT file_id, 'hour' AS period, date_trunc('hour', date) AS bucket, bytes, partial FROM consumed
+    UNION ALL
+    SELECT file_id, 'day' AS period, date_trunc('day', date) AS bucket, bytes, partial FROM consumed
+)
+INSERT INTO download_stat (file_id, period, bucket, downloads, bytes, range_requests)
+SELECT file_id, period, bucket, count(*), sum(bytes), count(*) FILTER (WHERE partial)
+FROM buckets
+GROUP BY file_id, period, bucket
+ON CONFLICT (file_id, period, bucket) DO UPDATE SET
+    downloads = download_stat.downloads + excluded.downloads,
+    bytes = download_stat.bytes + excluded.bytes,
+    range_requests = download_stat.range_requests + excluded.range_requests
+RETURNING (SELECT count(*) FROM consumed)
+""")
+
+
+def rollup_downloads(batch_size=10000):
+    """
+    Move the download events into the hourly and daily statistics
+
+    Returns the number of events processed
+    """
+    total = 0
+    while True:
+        consumed = db.session.execute(ROLLUP_QUERY, {"batch_size": batch_size}).scalar() or 0
+        db.session.commit()
+        total += consumed
+        if consumed < batch_size:
+            return total
+
+
+def _format_bucket(bucket, period):
+    return bucket.strftime('%Y-%m-%d' if period == "day" else '%Y-%m-%d %H:00')
+
+
+def get_file_stats(file_id, period="day", limit=30):
+    """Statistics of the last 'limit' buckets with downloads, oldest first"""
+    stats = DownloadStat.query.filter_by(file_id=file_id, period=period).order_by(desc(DownloadStat.bucket)).limit(limit).all()
+
+    return [{
+        'date': _format_bucket(stat.bucket, period),
+        'downloads': stat.downloads,
+        'bytes': stat.bytes,
+        'range_requests': stat.range_requests
+    } for stat in reversed(stats)]
+
+
+def get_top_files(period="day", duration=7, limit=10):
+    """Most downloaded published files in the last 'duration' hours or days"""
+    since = datetime.utcnow() - (timedelta(days=duration) if period == "day" else timedelta(hours=duration))
+    since = since.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        since = since.replace(hour=0)
+
+    top = db.session.query(DownloadStat.file_id, func.sum(DownloadStat.downloads).label("downloads"), func.sum(DownloadStat.bytes).label("bytes")) \
+        .filter(DownloadStat.period == period, DownloadStat.bucket >= since) \
+        .group_by(DownloadStat.file_id) \
+        .subquery()
+
+    rows = db.session.query(PublishedFile, top.c.downloads, top.c.bytes) \
+        .join(top, top.c.file_id == PublishedFile.id) \
+        .filter(PublishedFile.status != "unpublished") \
+        .order_by(desc(top.c.downloads), PublishedFile.id) \
+        .limit(limit)
+
+    return [{
+        'uri': datafile.id,
+        'file_name': datafile.file_name,
+        'downloads': int(file_downloads),
+        'bytes': int(file_bytes)
+    } for datafile, file_downloads, file_bytes in rows]
@@ -0,0 +1,98 @@
+from golink.db_models import PublishedFile, Tag, junction_table
+from golink.extensions import db
+
+from sqlalchemy import and_, desc, exists, func, select
+from sqlalchemy.orm import aliased
+
+
+def get_or_create_tags(tag_names):
+    """
+    Return a {name: Tag} dict for the given tag names, creating the missing tags (not committed)
+    """
+    tag_names = set(tag_names)
+    if not tag_names:
+        return {}
+
+    tags = dict((tag.tag, tag) for tag in Tag.query.filter(Tag.tag.in_(tag_names)))
+    for tag_name in tag_names - set(tags):
+        tag = Tag(tag=tag_name)
+        db.session.add(tag)
+        tags[tag_name] = tag
+
+    return tags
+
+
+def get_tag_counts(prefix="", limit=0, names=None):
+    """
+    Return {name: number of files} for all tags (or those starting with prefix, or in names), most used first
+
+    Tags sharing the same name are merged.
+    """
+    count = func.count(junction_table.c.file_id)
+    tags = db.session.query(Tag.tag, count).outerjoin(junction_table, junction_table.c.tag_id == Tag.id)
+
+    if prefix:
+        tags = tags.filter(Tag.tag.startswith(prefix, autoescape=True))
+    if names is not None:
+        tags = tags.filter(Tag.tag.in_(list(names)))
+
+    tags = tags.group_by(Tag.tag).order_by(desc(count), Tag.tag)
+    if limit > 0:
+        tags = tags.limit(limit)
+
+    return dict((name, tag_count) for name, tag_count in tags)
+
+
+def add_tags(file_ids, tag_names):
+    """
+    Tag the given files with a single INSERT ... SELECT, skipping the files already having a tag of the same name
+
+    Missing tags are created. Returns the number of links added (not committed)
+    """
+    if not file_ids or not tag_names:
+        return 0
+
+    tags = get_or_create_tags(tag_names)
+    db.session.flush()
+
+    other_tag = aliased(Tag)
+    already_tagged = exists().where(and_(
+        junction_table.c.tag_id == other_tag.id,
+        junction_table.c.file_id == PublishedFile.id,
+        other_tag.tag == Tag.tag
+    ))
+    links = select([PublishedFile.id, Tag.id]) \
+        .where(PublishedFile.id.in_(file_ids)) \
+        .where(Tag.id.in_([tag.id for tag in tags.values()])) \
+        .where(~already_tagged)
+
+    return db.session.execute(junction_table.insert().from_select(["file_id", "tag_id"], links)).rowcount
+
+
+def remove_tags(file_ids, tag_names):
+    """
+    Untag the given files with a single DELETE. Returns the number of links removed (not committed)
+    """
+    if not file_ids or not tag_names:
+        return 0
+
+    tag_ids = select([Tag.id]).where(Tag.tag.in_(list(tag_names)))
+    statement = junction_table.delete() \
+        .where(junction_table.c.file_id.in_(file_ids)) \
+        .where(junction_table.c.tag_id.in_(tag_ids))
+    return db.session.execute(statement).rowcount
+
+
+def delete_orphan_tags(tag_names):
+    """
+    Delete the given tags if they are not linked to any file anymore, with a single DELETE
+
+    Returns the number of deleted tags (not committed)
+    """
+    if not tag_names:
+        return 0
+
+    statement = Tag.__table__.delete() \
+        .where(Tag.tag.in_(list(tag_names))) \
+        .where(~exists().where(junction_table.c.tag_id == Tag.id))
+    return db.session.execute(statement).rowcount
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from golink.utils import get_celery_worker_status, redis_error
+
+
+HEARTBEAT_KEY = "golink:workers"
+
+
+class WorkerMonitor():
+    """
+    Celery workers availability, based on heartbeats
+
+    Each worker regularly records its hostname and the current time in a redis sorted set
+    (on the broker). Web processes read the workers seen in the last WORKER_HEARTBEAT_TIMEOUT
+    seconds with a single query, and keep the result for WORKER_STATUS_CACHE_TTL seconds.
+    With a non-redis broker, it falls back to a (cached) broadcast ping.
+    """
+
+    def __init__(self, celery, config):
+        self.celery = celery
+        self.interval = config.get("WORKER_HEARTBEAT_INTERVAL", 5)
+        self.timeout = config.get("WORKER_HEARTBEAT_TIMEOUT", 30)
+        self.cache_ttl = config.get("WORKER_STATUS_CACHE_TTL", 5)
+
+        self.redis = None
+        broker_url = config.get("CELERY_BROKER_URL", "")
+        if broker_url.startswith("redis://") or broker_url.startswith("rediss://"):
+            import redis
+
+            self.redis = redis.Redis.from_url(broker_url, socket_timeout=1, socket_connect_timeout=1)
+
+        self._status = None
+        self._status_time = 0
+        self._lock = threading.Lock()
+
+    def get_status(self):
+        """Return {'availability': {hostname: {'ok': 'pong'}} or None, 'workers': {hostname: seconds since last heartbeat}}"""
+        now = time.monotonic()
+        status = self._status
+        if status is not None and now - self._status_time < self.cache_ttl:
+            return status
+
+        # Only one thread refreshes the status, the others use the previous one meanwhile
+        if status is None:
+            self._lock.acquire()
+        elif not self._lock.acquire(blocking=False):
+            return status
+
+        try:
+            if self.redis is not None:
+                status = self._read_heartbeats()
+            else:
+                availability = get_celery_worker_status(self.celery)['availability']
+                status = {'availability': availability, 'workers': dict((worker, 0) for worker in availability or {})}
+            self._status = status
+            self._status_time = time.monotonic()
+        finally:
+            self._lock.release()
+
+        return status
+
+    def _read_heartbeats(self):
+        now = time.time()
+        try:
+            heartbeats = self.redis.zrangebyscore(HEARTBEAT_KEY, now - self.timeout, "+inf", withscores=True)
+        except redis_error() as e:
+            return {'availability': None, 'workers': {}, 'error': str(e)}
+
+        workers = dict((worker.decode(), round(now - last_seen, 1)) for worker, last_seen in heartbeats)
+        availability = dict((worker, {'ok': 'pong'}) for worker in workers) or None
+        return {'availability': availability, 'workers': workers}
+
+    def start_heartbeat(self, hostname):
+        """Start sending heartbeats for a worker, in a daemon thread"""
+        if self.redis is None:
+            return
+
+        self._stop = threading.Event()
+        thread = threading.Thread(target=self._heartbeat_loop, args=(hostname, ), name="golink-heartbeat", daemon=True)
+        thread.start()
+
+    def stop_heartbeat(self, hostname):
+        if self.redis is None:
+            return
+
+        self._stop.set()
+        try:
+            self.redis.zrem(HEARTBEAT_KEY, hostname)
+        except redis_error():
+            pass
+
+    def _heartbeat_loop(self, hostname):
+        while not self._stop.is_set():
+            now = time.time()
+            try:
+                pipe = self.redis.pipeline()
+                pipe.zadd(HEARTBEAT_KEY, {hostname: now})
+                # Forget workers gone for a long time
+                pipe.zremrangebyscore(HEARTBEAT_KEY, "-inf", now - 10 * self.timeout)
+                pipe.execute()
+            except redis_error():
+                pass
+            self._stop.wait(self.interval)
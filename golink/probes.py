@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+
+class DependencyProbe():
+    """
+    Availability of an external service (LDAP, Baricadr), checked in the background
+
+    The check runs in a daemon thread, so that a slow or unreachable service never blocks the startup or a request:
+    get() returns the last known result (None until the first check ends), and starts a new check when the result
+    is older than interval seconds. The check itself must be time-bounded (network timeouts).
+    on_result(result) is called after each check.
+    """
+
+    def __init__(self, name, check, interval=60, on_result=None, logger=None):
+        self.name = name
+        self.check = check
+        self.interval = interval
+        self.on_result = on_result
+        self.logger = logger
+
+        self.result = None
+        self.error = None
+        self.duration = None
+        self.checks = 0
+        self._checked_at = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self):
+        """Start a check in the background, unless one is running"""
+        with self._lock:
+            # Threads do not survive a fork (uWSGI workers, celery prefork)
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._done.clear()
+            self._thread = threading.Thread(target=self._run, name="golink-probe-%s" % self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        start = time.monotonic()
+        try:
+            result = bool(self.check())
+            error = None
+        except Exception as e:
+            result = False
+            error = str(e)
+
+        self.duration = time.monotonic() - start
+        self.result = result
+        self.error = error
+        self.checks += 1
+        self._checked_at = time.monotonic()
+
+        if self.logger and not result:
+            self.logger.error("%s is not available%s" % (self.name, ": %s" % error if error else ""))
+
+        if self.on_result:
+            self.on_result(result)
+        self._done.set()
+
+    def get(self):
+        """Last known availability (None if unknown), refreshed in the background when outdated"""
+        if self._checked_at is None or time.monotonic() - self._checked_at > self.interval:
+            self.start()
+        return self.result
+
+    def wait(self, timeout=None):
+        """Wait for the running check to end"""
+        return self._done.wait(timeout)
+
+    def status(self):
+        return {
+            'available': self.result,
+            'error': self.error,
+            'checks': self.checks,
+            'last_check': round(time.monotonic() - self._checked_at, 1) if self._checked_at is not None else None,
+            'duration': round(self.duration, 3) if self.duration is not None else None
+        }
@@ -0,0 +1,82 @@
+import mimetypes
+import os
+import uuid
+
+from flask import Response
+
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+
+
+MAX_RANGES = 16
+CHUNK_SIZE = 256 * 1024
+
+
+def resolve_ranges(requested_range, size):
+    """
+    Return the satisfiable byte ranges of a werkzeug Range for a file of size bytes
+
+    Ranges are returned as sorted (start, stop) tuples, stop excluded, with overlapping or adjacent ranges merged.
+    """
+    ranges = []
+    for start, stop in requested_range.ranges:
+        if start < 0:
+            start, stop = max(0, size + start), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def _read_ranges(path, ranges, separators=None):
+    with open(path, "rb") as f:
+        for index, (start, stop) in enumerate(ranges):
+            if separators:
+                yield separators[index]
+            f.seek(start)
+            remaining = stop - start
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        if separators:
+            yield separators[-1]
+
+
+def ranges_response(path, requested_range, size):
+    """
+    206 response for a request with several byte ranges (which werkzeug does not handle)
+
+    A single satisfiable range (after merging) is sent as is, several ranges as multipart/byteranges.
+    """
+    ranges = resolve_ranges(requested_range, size)
+    if not ranges or len(ranges) > MAX_RANGES:
+        raise RequestedRangeNotSatisfiable(length=size)
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        response = Response(_read_ranges(path, ranges), status=206, mimetype=content_type, direct_passthrough=True)
+        response.content_length = stop - start
+        response.content_range = "bytes %s-%s/%s" % (start, stop - 1, size)
+    else:
+        boundary = uuid.uuid4().hex
+        separators = [("%s--%s\r\nContent-Type: %s\r\nContent-Range: bytes %s-%s/%s\r\n\r\n" % ("\r\n" if index else "", boundary, content_type, start, stop - 1, size)).encode() for index, (start, stop) in enumerate(ranges)]
+        separators.append(("\r\n--%s--\r\n" % boundary).encode())
+
+        response = Response(_read_ranges(path, ranges, separators), status=206, mimetype="multipart/byteranges; boundary=%s" % boundary, direct_passthrough=True)
+        response.content_length = sum(len(separator) for separator in separators) + sum(stop - start for start, stop in ranges)
+
+    response.headers.set("Content-Disposition", "attachment", filename=os.path.basename(path))
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
@@ -0,0 +1,128 @@
+import bisect
+import heapq
+import threading
+import time
+
+from golink.model.tags import get_tag_counts
+
+
+class TagIndex():
+    """
+    In-memory index of tag names and usage counts, for autocompletion
+
+    Names are kept sorted, so the tags starting with a prefix are a contiguous slice found by bisection.
+    The best matches of the empty, 1 and 2 characters prefixes (whose slices are large) are precomputed,
+    longer prefixes select a small slice. Results are ordered by count (descending), then name.
+
+    The index is built on first use from the database, updated in place by the changes made in this process,
+    and rebuilt every refresh_interval seconds to catch up with the other processes.
+    """
+
+    PRECOMPUTED_LENGTH = 2
+
+    def __init__(self, max_results=50, refresh_interval=300):
+        self.max_results = max_results
+        self.refresh_interval = refresh_interval
+        self.names = []
+        self.counts = {}
+        self.loaded_at = None
+        self._top = {}
+        self._lock = threading.RLock()
+
+    def build(self, counts):
+        with self._lock:
+            self.counts = dict(counts)
+            self.names = sorted(self.counts)
+            self._top = {}
+            for length in range(self.PRECOMPUTED_LENGTH + 1):
+                for prefix in set(name[:length] for name in self.names if len(name) >= length):
+                    self._top[prefix] = self._best(prefix)
+            self.loaded_at = time.monotonic()
+
+    def load(self):
+        """Build the index from the database if it was never built or is too old"""
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.refresh_interval:
+            return
+
+        self.build(get_tag_counts())
+
+    def _range(self, prefix):
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + "\U0010ffff", lo=start)
+        return start, end
+
+    def _best(self, prefix, limit=None):
+        start, end = self._range(prefix)
+        return heapq.nsmallest(limit or self.max_results, self.names[start:end], key=lambda name: (-self.counts[name], name))
+
+    def suggest(self, prefix, limit=10):
+        """Return the [(name, count)] of the most used tags starting with prefix"""
+        limit = min(limit, self.max_results)
+        with self._lock:
+            if len(prefix) <= self.PRECOMPUTED_LENGTH:
+                names = self._top.get(prefix, [])[:limit]
+            else:
+                names = self._best(prefix, limit)
+            return [(name, self.counts[name]) for name in names]
+
+    def update(self, deltas):
+        """Apply {name: count variation} (new names are added)"""
+        if self.loaded_at is None:
+            return
+
+        with self._lock:
+            for name, delta in deltas.items():
+                if name not in self.counts:
+                    bisect.insort(self.names, name)
+                    self.counts[name] = 0
+                self.counts[name] = max(0, self.counts[name] + delta)
+                self._refresh_top(name)
+
+    def refresh(self, names):
+        """Reload the counts of the given names from the database (after changes not tracked one by one)"""
+        if self.loaded_at is None or not names:
+            return
+
+        counts = get_tag_counts(names=names)
+        with self._lock:
+            self.update(dict((name, count - self.counts.get(name, 0)) for name, count in counts.items()))
+            self.remove([name for name in names if name not in counts])
+
+    def remove(self, names):
+        if self.loaded_at is None:
+            return
+
+        with self._lock:
+            for name in names:
+                if name in self.counts:
+                    del self.counts[name]
+                    self.names.pop(bisect.bisect_left(self.names, name))
+                    self._refresh_top(name)
+
+    def _key(self, name):
+        return (-self.counts[name], name)
+
+    def _refresh_top(self, name):
+        """Update the precomputed results including a changed name, without rescanning their whole prefix range"""
+        for length in range(min(len(name), self.PRECOMPUTED_LENGTH) + 1):
+            prefix = name[:length]
+            top = self._top.get(prefix, [])
+            # A list shorter than max_results holds all the names with this prefix
+            full = len(top) >= self.max_results
+
+            if name in top:
+                others = [other for other in top if other != name]
+                if name in self.counts and (not full or not others or self._key(name) <= self._key(others[-1])):
+                    top = sorted(others + [name], key=self._key)
+                elif full:
+                    # Dropped out: the next best name is unknown
+                    top = self._best(prefix)
+                else:
+                    top = others
+            elif name in self.counts and (not full or self._key(name) < self._key(top[-1])):
+                top = sorted(top + [name], key=self._key)[:self.max_results]
+
+            if top:
+                self._top[prefix] = top
+            else:
+                self._top.pop(prefix, None)
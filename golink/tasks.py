@@ -1,17 +1,20 @@
-import hashlib
 import os
 import time
 
-from celery.signals import task_postrun
+from celery.signals import task_postrun, worker_ready, worker_shutdown
 
 from flask_mail import Message
 
 from golink.app import create_app, create_celery
+from golink.cache import FILE_LISTINGS
 from golink.db_models import PublishedFile
 from golink.extensions import db
 from golink.extensions import mail
-
-import requests
+from golink.hashing import ResumableHash, get_hasher, hash_file, is_resumable, resumable_backend
+from golink.model.availability import scan_availability
+from golink.model.hash_cache import get_cached_hash, store_hash
+from golink.model.outbox import dispatch_outbox
+from golink.model.stats import rollup_downloads
 
 
 app = create_app(config='../local.cfg', is_worker=True)
@@ -41,25 +44,46 @@ Cheers
 
     p_file.status = 'failed'
     db.session.commit()
+    app.response_cache.invalidate_files([p_file.id], listings=FILE_LISTINGS)
 
 
-@celery.task(bind=True, name="publish", on_failure=on_failure)
+# acks_late + reject_on_worker_lost: the task is delivered again if the worker dies while hashing
+@celery.task(bind=True, name="publish", on_failure=on_failure, acks_late=True, reject_on_worker_lost=True)
 def publish_file(self, file_id, old_path, email=""):
     # Send task to copy file
     # (Copy file, create symlink)
 
-    # Wait a bit in case the tasks begin just before it is recorded in the db
-    time.sleep(2)
     p_file = PublishedFile.query.filter_by(id=file_id).one()
     p_file.task_id = self.request.id
     p_file.status = 'starting'
     db.session.commit()
+    app.response_cache.invalidate_files([p_file.id], listings=FILE_LISTINGS)
     # Copy or move?
 
-    file_md5 = md5(p_file.file_path)
-    p_file.hash = file_md5
+    file_stat = os.stat(p_file.file_path)
+    cached = None
+    if app.config['HASH_CACHE']:
+        cached = get_cached_hash(file_stat, app.config['HASH_ALGORITHMS'])
+
+    if cached:
+        app.logger.info("Hash cache hit for file %s" % p_file.file_path)
+        digests = dict(cached.checksums or {}, md5=cached.hash)
+    else:
+        digests = compute_digests(p_file, file_stat)
+
+    p_file.hash = digests['md5']
+    p_file.checksums = dict((algorithm, digests[algorithm]) for algorithm in app.config['HASH_ALGORITHMS'] if algorithm != 'md5') or None
+    p_file.hashed_size = file_stat.st_size
+    p_file.hash_checkpoints = None
     p_file.status = 'available'
     db.session.commit()
+    app.response_cache.invalidate_files([p_file.id], listings=FILE_LISTINGS)
+
+    # Only cache the digests if the file was not modified while hashing
+    if app.config['HASH_CACHE'] and not cached:
+        new_stat = os.stat(p_file.file_path)
+        if (new_stat.st_size, new_stat.st_mtime_ns) == (file_stat.st_size, file_stat.st_mtime_ns):
+            store_hash(file_stat, digests)
 
     if email:
         body = """Hello,
@@ -83,6 +107,26 @@ def pull_file(self, file_id, email=""):
     pull_from_baricadr(path, email=email)
 
 
+@celery.task(name="dispatch_outbox")
+def dispatch_outbox_task():
+    # Send tasks which were not sent right after their transaction (broker down, web process killed, ...)
+    sent = dispatch_outbox(min_age=app.config['OUTBOX_DISPATCH_INTERVAL'])
+    if sent:
+        app.logger.warning("Sent %s tasks left in the outbox" % sent)
+
+
+@celery.task(name="rollup_downloads")
+def rollup_downloads_task():
+    rollup_downloads()
+
+
+@celery.task(name="scan_availability")
+def scan_availability_task():
+    updated = scan_availability(threads=app.config['AVAILABILITY_SCAN_THREADS'])
+    for status, count in updated.items():
+        app.logger.info("%s files are now %s" % (count, status))
+
+
 @task_postrun.connect
 def close_session(*args, **kwargs):
     # Flask SQLAlchemy will automatically create new sessions for you from
@@ -92,18 +136,93 @@ def close_session(*args, **kwargs):
     db.session.remove()
 
 
+class HashProgress():
+
+    def __init__(self, p_file, offset=0):
+        self.p_file = p_file
+        self.hashed_size = offset
+        self.start_offset = offset
+        self.start = time.monotonic()
+        self.last_save = self.start
+
+    def update(self, read):
+        self.hashed_size += read
+        if time.monotonic() - self.last_save >= app.config['HASH_PROGRESS_INTERVAL']:
+            self.save()
+
+    def save(self):
+        now = time.monotonic()
+        self.p_file.hashed_size = self.hashed_size
+        if now > self.start:
+            self.p_file.hash_rate = (self.hashed_size - self.start_offset) / (now - self.start)
+        db.session.commit()
+        # Only the progress in the file view changed
+        app.response_cache.invalidate([self.p_file.id], listings=())
+        self.last_save = now
+
+
+def compute_digests(p_file, file_stat):
+    # Hash the file, saving the hashing state every HASH_CHECKPOINT_SIZE bytes (0 to disable),
+    # so that a restarted task can resume from the last checkpoint
+    algorithms = app.config['HASH_ALGORITHMS']
+    file_size = file_stat.st_size
+
+    checkpoint_size = app.config['HASH_CHECKPOINT_SIZE']
+    if checkpoint_size and not all(is_resumable(algorithm) for algorithm in algorithms):
+        app.logger.info("Hashing of file %s cannot be resumed with algorithms %s" % (p_file.file_path, ", ".join(algorithms)))
+        checkpoint_size = 0
+
+    state = {
+        "size": file_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "algorithms": algorithms,
+        "backend": resumable_backend() if checkpoint_size else None
+    }
+
+    offset = 0
+    hashers = None
+    checkpoints = p_file.hash_checkpoints
+    if checkpoint_size and checkpoints and all(checkpoints.get(key) == value for key, value in state.items()):
+        try:
+            hashers = dict((algorithm, ResumableHash(algorithm, state=checkpoints["states"][algorithm])) for algorithm in algorithms)
+            offset = checkpoints["offset"]
+            app.logger.info("Resuming hashing of file %s from byte %s" % (p_file.file_path, offset))
+        except (KeyError, ValueError):
+            hashers = None
+
+    if hashers is None:
+        hashers = dict((algorithm, ResumableHash(algorithm) if checkpoint_size else get_hasher(algorithm)) for algorithm in algorithms)
+
+    progress = HashProgress(p_file, offset=offset)
+    progress.save()
+
+    while True:
+        hash_file(p_file.file_path, buffer_size=app.config['HASH_BUFFER_SIZE'], callback=progress.update, offset=offset, length=checkpoint_size or None, hashers=hashers)
+        offset += checkpoint_size
+        if not checkpoint_size or offset >= file_size:
+            break
+        p_file.hash_checkpoints = dict(state, offset=offset, states=dict((algorithm, hasher.get_state()) for algorithm, hasher in hashers.items()))
+        progress.save()
+
+    return dict((algorithm, hasher.hexdigest()) for algorithm, hasher in hashers.items())
+
+
+@worker_ready.connect
+def start_heartbeat(sender, **kwargs):
+    app.worker_monitor.start_heartbeat(sender.hostname)
+
+
+@worker_shutdown.connect
+def stop_heartbeat(sender, **kwargs):
+    app.worker_monitor.stop_heartbeat(sender.hostname)
+
+
 def pull_from_baricadr(file_path, email=""):
+    import requests
+
     url = "%s/pull" % app.config.get("BARICADR_URL")
     data = {"path": file_path}
     if email:
         data['email'] = email
     requests.post(url, auth=(app.config.get("BARICADR_USER"), app.config.get("BARICADR_PASSWORD")), json=data)
     # How do we manage failure? Mail admin?
-
-
-def md5(fname):
-    hash_md5 = hashlib.md5()
-    with open(fname, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
@@ -0,0 +1,52 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from golink.utils import validate_token
+
+
+class TokenCache():
+    """
+    LRU cache of validated tokens, to avoid verifying the signature of the same token on each request
+
+    Entries are keyed by the token digest (the tokens themselves are not kept), and dropped when the token expires.
+    Only valid tokens with an expiration date are cached.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.max_entries = config.get("TOKEN_CACHE_SIZE", 1024)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, token):
+        """Same as golink.utils.validate_token, returns {"valid": bool, "username", "is_admin"} or {"valid": False, "error"}"""
+        if not self.max_entries:
+            user_data = validate_token(token, self.config)
+            user_data.pop("expires", None)
+            return user_data
+
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user_data, expires = entry
+                if expires > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(user_data)
+                del self._entries[key]
+            self.misses += 1
+
+        user_data = validate_token(token, self.config)
+        expires = user_data.pop("expires", None)
+        if user_data["valid"] and expires is not None:
+            with self._lock:
+                self._entries[key] = (dict(user_data), expires)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return user_data
@@ -1,9 +1,5 @@
 from uuid import UUID
 
-import jwt
-
-from ldap3 import Connection, NONE, Server
-
 
 def get_celery_worker_status(app):
     i = app.control.inspect()
@@ -64,49 +60,24 @@ def is_valid_uuid(uuid_to_test, version=4):
     return str(uuid_obj) == uuid_to_test
 
 
-def authenticate_user(username, password, api_key, config):
+def authenticate_user(username, password, api_key, config, ldap_client):
     if api_key and api_key in config.get("ADMIN_API_KEYS"):
         return True
 
-    server = Server(config.get("LDAP_HOST"), config.get("LDAP_PORT", 389), get_info=NONE)
-    conn = Connection(server, auto_bind=True)
-    user = conn.search(config.get("LDAP_BASE_QUERY"), '(uid=%s)' % username, attributes=['uidNumber'], size_limit=1, time_limit=10)
-    if not user:
-        return False
-    full_dn = conn.entries[0].entry_dn
-    # Check password
-    logged_in = conn.rebind(user=full_dn, password=password)
-    conn.unbind()
-    return logged_in
+    return ldap_client.authenticate(username, password)
 
 
 def validate_token(token, config):
+    import jwt
+
     try:
         payload = jwt.decode(token, config['SECRET_KEY'], algorithms=["HS256"])
     except jwt.exceptions.ExpiredSignatureError:
         return {"valid": False, "error": "Expired token"}
     except jwt.exceptions.InvalidTokenError:
         return {"valid": False, "error": "Invalid token"}
-    return {"valid": True, "username": payload['username'], "is_admin": payload['username'] in config.get('ADMIN_USERS')}
-
-
-def get_user_ldap_data(username, config):
-    data = {"user_id": None, "user_group_names": [], "user_group_ids": [], "error": None}
-    server = Server(config.get("LDAP_HOST"), config.get("LDAP_PORT", 389), get_info=NONE)
-    conn = Connection(server, auto_bind=True)
-    # Basic query to see if it works
-    user = conn.search(config.get("LDAP_BASE_QUERY"), '(uid=%s)' % username, attributes=['uidNumber'], size_limit=1, time_limit=10)
-    if not user:
-        data['error'] = "Could not find user %s in LDAP" % username
-        return data
-    data['user_id'] = conn.entries[0]['uidNumber'].values[0]
-    conn.search(config.get("LDAP_BASE_QUERY"), '(memberuid=%s)' % username, attributes=['gidNumber', 'cn'], time_limit=10)
-    for group in conn.entries:
-        data['user_group_names'].append(group['cn'][0])
-        data['user_group_ids'].append(group['gidNumber'][0])
-
-    conn.unbind()
-    return data
+    # ADMIN_USERS is a frozenset
+    return {"valid": True, "username": payload['username'], "is_admin": payload['username'] in config['ADMIN_USERS'], "expires": payload.get('exp')}
 
 
 def get_or_create(session, model, **kwargs):
@@ -117,3 +88,28 @@ def get_or_create(session, model, **kwargs):
         instance = model(**kwargs)
         session.add(instance)
         return instance
+
+
+class EmailNotValidError(ValueError):
+    pass
+
+
+def validate_email(email):
+    """email_validator.validate_email, raising golink.utils.EmailNotValidError (email_validator is only imported when needed)"""
+    import email_validator
+
+    try:
+        return email_validator.validate_email(email)
+    except email_validator.EmailNotValidError as e:
+        raise EmailNotValidError(str(e))
+
+
+def redis_error():
+    """
+    The base class of redis errors, for except clauses
+
+    redis is only imported when a redis backend is used: except clauses are only evaluated when an exception is raised.
+    """
+    import redis
+
+    return redis.exceptions.RedisError
@@ -0,0 +1,28 @@
+"""File name trigram index
+
+Revision ID: 0c9e5a7d3f28
+Revises: f2b6d09c4e17
+Create Date: 2026-10-18 16:12:47.205311
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0c9e5a7d3f28'
+down_revision = 'f2b6d09c4e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves the (case-insensitive) substring and prefix searches on file names, and relevance ranking
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX ix_published_file_file_name_trgm ON published_file USING gin (lower(file_name) gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_published_file_file_name_trgm")
@@ -0,0 +1,23 @@
+"""Hash cache invalidations
+
+Revision ID: 3e8d51c2a7f9
+Revises: 9a17c3e5d2b4
+Create Date: 2026-10-18 21:12:40.104271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3e8d51c2a7f9'
+down_revision = '9a17c3e5d2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('hash_cache', sa.Column('invalidations', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('hash_cache', 'invalidations')
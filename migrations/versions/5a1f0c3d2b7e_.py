@@ -0,0 +1,23 @@
+"""Additional file checksums
+
+Revision ID: 5a1f0c3d2b7e
+Revises: 303064567170
+Create Date: 2026-10-18 09:12:41.218334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5a1f0c3d2b7e'
+down_revision = '303064567170'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('published_file', sa.Column('checksums', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('published_file', 'checksums')
@@ -0,0 +1,47 @@
+"""Download statistics
+
+Revision ID: 6d4b2e8f1a93
+Revises: 0c9e5a7d3f28
+Create Date: 2026-10-18 16:58:20.913407
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '6d4b2e8f1a93'
+down_revision = '0c9e5a7d3f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('download_event',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('file_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('bytes', sa.BigInteger(), nullable=False),
+    sa.Column('partial', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id')
+    )
+    op.create_table('download_stat',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('file_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('period', sa.String(length=16), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('downloads', sa.Integer(), nullable=False),
+    sa.Column('bytes', sa.BigInteger(), nullable=False),
+    sa.Column('range_requests', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('file_id', 'period', 'bucket'),
+    sa.UniqueConstraint('id')
+    )
+    op.create_index('ix_download_stat_period_bucket', 'download_stat', ['period', 'bucket'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_download_stat_period_bucket', table_name='download_stat')
+    op.drop_table('download_stat')
+    op.drop_table('download_event')
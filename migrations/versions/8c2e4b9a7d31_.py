@@ -0,0 +1,37 @@
+"""Hash cache
+
+Revision ID: 8c2e4b9a7d31
+Revises: 5a1f0c3d2b7e
+Create Date: 2026-10-18 10:03:17.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8c2e4b9a7d31'
+down_revision = '5a1f0c3d2b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('hash_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device', sa.BigInteger(), nullable=False),
+    sa.Column('inode', sa.BigInteger(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+    sa.Column('hash', sa.String(length=255), nullable=False),
+    sa.Column('checksums', sa.JSON(), nullable=True),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('misses', sa.Integer(), nullable=False),
+    sa.Column('last_hit', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('device', 'inode'),
+    sa.UniqueConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('hash_cache')
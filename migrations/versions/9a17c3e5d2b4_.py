@@ -0,0 +1,22 @@
+"""Tag prefix index
+
+Revision ID: 9a17c3e5d2b4
+Revises: 6d4b2e8f1a93
+Create Date: 2026-10-18 18:07:52.318845
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9a17c3e5d2b4'
+down_revision = '6d4b2e8f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_tag_tag_pattern', 'tag', ['tag'], unique=False, postgresql_ops={'tag': 'varchar_pattern_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_tag_tag_pattern', table_name='tag')
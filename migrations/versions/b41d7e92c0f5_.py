@@ -0,0 +1,32 @@
+"""Task outbox
+
+Revision ID: b41d7e92c0f5
+Revises: 8c2e4b9a7d31
+Create Date: 2026-10-18 11:24:52.803177
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b41d7e92c0f5'
+down_revision = '8c2e4b9a7d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_name', sa.String(length=255), nullable=False),
+    sa.Column('args', sa.JSON(), nullable=False),
+    sa.Column('creation_date', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id')
+    )
+    op.create_index(op.f('ix_task_outbox_creation_date'), 'task_outbox', ['creation_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_task_outbox_creation_date'), table_name='task_outbox')
+    op.drop_table('task_outbox')
@@ -0,0 +1,27 @@
+"""Hashing progress
+
+Revision ID: d7a3f61e58b2
+Revises: b41d7e92c0f5
+Create Date: 2026-10-18 13:40:06.112958
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f61e58b2'
+down_revision = 'b41d7e92c0f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('published_file', sa.Column('hashed_size', sa.BigInteger(), nullable=True))
+    op.add_column('published_file', sa.Column('hash_rate', sa.Float(), nullable=True))
+    op.add_column('published_file', sa.Column('hash_checkpoints', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('published_file', 'hash_checkpoints')
+    op.drop_column('published_file', 'hash_rate')
+    op.drop_column('published_file', 'hashed_size')
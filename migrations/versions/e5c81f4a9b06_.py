@@ -0,0 +1,22 @@
+"""Listing index
+
+Revision ID: e5c81f4a9b06
+Revises: d7a3f61e58b2
+Create Date: 2026-10-18 15:02:31.480216
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e5c81f4a9b06'
+down_revision = 'd7a3f61e58b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_published_file_publishing_date_id', 'published_file', ['publishing_date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_published_file_publishing_date_id', table_name='published_file')
@@ -0,0 +1,22 @@
+"""Tag lookup index
+
+Revision ID: f2b6d09c4e17
+Revises: e5c81f4a9b06
+Create Date: 2026-10-18 15:41:12.730154
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d09c4e17'
+down_revision = 'e5c81f4a9b06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_file_tag_tag_id_file_id', 'file_tag', ['tag_id', 'file_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_file_tag_tag_id_file_id', table_name='file_tag')
@@ -0,0 +1,28 @@
+from golink.extensions import db
+
+from . import GolinkTestCase
+
+
+class TestApiAdmin(GolinkTestCase):
+
+    def teardown_method(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_health_not_admin(self, app, client):
+        token = self.create_mock_token(app)
+
+        response = client.get("/api/admin/health", headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 401
+
+    def test_health(self, app, client):
+        token = self.create_mock_token(app, user="adminuser")
+
+        response = client.get("/api/admin/health", headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        # Worker availability is checked in tests/test_worker_monitor.py
+        assert 'workers' in response.json
+        assert response.json['repos']['repositories'] == 1
+        assert response.json['repos']['generation'] == 1
@@ -0,0 +1,149 @@
+import os
+import shutil
+from contextlib import contextmanager
+
+from golink.extensions import db
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import GolinkTestCase
+
+
+class TestApiList(GolinkTestCase):
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    @contextmanager
+    def count_queries(self):
+        # The client uses its own app (and engine): listen on all engines
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    def test_list_tags(self, app, client):
+        self.create_mock_published_file("available", tags=["tag1", "tag2"])
+        self.create_mock_published_file("available", tags=["tag3"])
+        self.create_mock_published_file("available")
+
+        response = client.get("/api/list")
+
+        assert response.status_code == 200
+        assert [file['tags'] for file in response.json['files']] == [[], ["tag3"], ["tag1", "tag2"]]
+        assert response.json['tags'] == [{"tag": "tag1", "count": 1}, {"tag": "tag2", "count": 1}, {"tag": "tag3", "count": 1}]
+
+    def test_list_query_count(self, app, client):
+        for i in range(5):
+            self.create_mock_published_file("available", tags=["tag%s" % i])
+        db.session.remove()
+
+        # Count, page and tags of the page, whatever the number of files
+        with self.count_queries() as statements:
+            response = client.get("/api/list")
+        assert response.status_code == 200
+        assert len(response.json['files']) == 5
+        assert len(statements) == 3
+
+        with self.count_queries() as statements:
+            response = client.get("/api/search", query_string={'file': 'my_file'})
+        assert response.status_code == 200
+        assert len(response.json['files']) == 5
+        assert len(statements) == 3
+
+    def test_list_filter_tags(self, app, client):
+        file_1 = self.create_mock_published_file("available", tags=["tag1", "tag2"])
+        file_2 = self.create_mock_published_file("available", tags=["tag2", "tag3"])
+        file_3 = self.create_mock_published_file("available", tags=["tag3"])
+
+        def list_uris(**query):
+            response = client.get("/api/list", query_string=query)
+            assert response.status_code == 200
+            return sorted(file['uri'] for file in response.json['files'])
+
+        assert list_uris(tags=["tag2"]) == sorted([file_1, file_2])
+        assert list_uris(tags=["tag2", "TAG3 "]) == [file_2]
+        assert list_uris(tags=["tag2", "blabla"]) == []
+        assert list_uris(any_tags=["tag1", "tag3"]) == sorted([file_1, file_2, file_3])
+        assert list_uris(not_tags=["tag2"]) == [file_3]
+        assert list_uris(any_tags=["tag1", "tag3"], not_tags=["tag1"]) == sorted([file_2, file_3])
+        assert list_uris(tags=["tag3"], not_tags=["tag2"]) == [file_3]
+
+    def test_list_offset(self, app, client):
+        file_ids = [self.create_mock_published_file("available") for i in range(3)]
+
+        response = client.get("/api/list", query_string={'limit': 2, 'offset': 1})
+
+        assert response.status_code == 200
+        assert response.json['total'] == 3
+        assert [file['uri'] for file in response.json['files']] == file_ids[::-1][1:]
+
+    def test_list_cursor(self, app, client):
+        file_ids = [self.create_mock_published_file("available") for i in range(3)]
+
+        response = client.get("/api/list", query_string={'limit': 2})
+
+        assert response.status_code == 200
+        assert response.json['total'] == 3
+        assert [file['uri'] for file in response.json['files']] == file_ids[::-1][:2]
+        assert response.json['next']
+
+        response = client.get("/api/list", query_string={'limit': 2, 'cursor': response.json['next']})
+
+        assert response.status_code == 200
+        assert 'total' not in response.json
+        assert [file['uri'] for file in response.json['files']] == file_ids[:1]
+        assert response.json['next'] is None
+
+    def test_list_count(self, app, client):
+        self.create_mock_published_file("available")
+
+        response = client.get("/api/list", query_string={'count': 'none'})
+        assert response.status_code == 200
+        assert 'total' not in response.json
+        assert len(response.json['files']) == 1
+
+        response = client.get("/api/list", query_string={'count': 'estimate'})
+        assert response.status_code == 200
+        assert response.json['total'] >= 0
+
+    def test_list_wrong_parameters(self, app, client):
+        response = client.get("/api/list", query_string={'cursor': 'notacursor'})
+        assert response.status_code == 400
+        assert response.json == {'error': 'Invalid cursor'}
+
+        response = client.get("/api/list", query_string={'count': 'blabla'})
+        assert response.status_code == 400
+
+    def test_search_cursor(self, app, client):
+        file_ids = [self.create_mock_published_file("available") for i in range(2)]
+
+        response = client.get("/api/search", query_string={'file': 'my_file', 'limit': 1})
+
+        assert response.status_code == 200
+        assert response.json['total'] == 2
+        assert [file['uri'] for file in response.json['files']] == file_ids[1:]
+
+        response = client.get("/api/search", query_string={'file': 'my_file', 'limit': 1, 'cursor': response.json['next']})
+
+        assert response.status_code == 200
+        assert [file['uri'] for file in response.json['files']] == file_ids[:1]
+        assert response.json['next'] is None
@@ -216,3 +216,46 @@ class TestApiPublish(GolinkTestCase):
         assert 'file_id' in data
 
         assert data['version'] == 2
+
+    def test_publish_batch_missing_files(self, app, client):
+        token = self.create_mock_token(app)
+        response = client.post('/api/publish/batch', json={'tags': ['tag1']}, headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 400
+        assert response.json == {'error': 'Missing files'}
+
+    def test_publish_batch_not_object(self, app, client):
+        token = self.create_mock_token(app)
+        response = client.post('/api/publish/batch', json=[self.public_file], headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 400
+        assert response.json == {'error': 'Body must be a JSON object'}
+
+    def test_publish_batch(self, app, client):
+        file_id = self.create_mock_published_file("available", tags=["tag1"])
+
+        data = {
+            'files': [
+                self.public_file,
+                {'path': "/foo/bar"},
+                {'path': self.public_file, 'linked_to': file_id, 'tags': ['tag2']},
+                {'path': self.public_file, 'linked_to': file_id, 'inherit_tags': False}
+            ],
+            'tags': 'common_tag'
+        }
+        token = self.create_mock_token(app)
+        response = client.post('/api/publish/batch', json=data, headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        files = response.json['files']
+        assert response.json['message'] == "3 file(s) registering. They should be ready soon"
+        assert len(files) == 4
+        assert files[1] == {'path': "/foo/bar", 'error': 'File not found at path /foo/bar'}
+        assert [files[i]['version'] for i in (0, 2, 3)] == [1, 2, 3]
+        assert all('file_id' in files[i] for i in (0, 2, 3))
+
+        response = client.get("/api/view/" + files[2]['file_id'])
+        assert sorted(response.json['file']['tags']) == ['common_tag', 'tag1', 'tag2']
+
+        response = client.get("/api/view/" + files[3]['file_id'])
+        assert response.json['file']['tags'] == ['common_tag']
@@ -0,0 +1,85 @@
+import os
+import shutil
+
+from . import GolinkTestCase
+
+
+class TestApiRepos(GolinkTestCase):
+
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repos = ["/repos/myrepo"]
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        for repo in self.testing_repos:
+            if os.path.exists(repo):
+                shutil.rmtree(repo)
+            shutil.copytree(self.template_repo, repo)
+
+    def teardown_method(self):
+        for repo in self.testing_repos:
+            if os.path.exists(repo):
+                shutil.rmtree(repo)
+
+    def test_can_publish_missing_token(self, app, client):
+        response = client.get('/api/repos' + self.public_file + '/can_publish')
+
+        assert response.status_code == 401
+
+    def test_can_publish(self, app, client):
+        token = self.create_mock_token(app)
+        response = client.get('/api/repos' + self.public_file + '/can_publish', headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        assert response.json == {'path': self.public_file, 'repo': '/repos/myrepo', 'can_publish': True, 'error': ''}
+
+    def test_can_publish_missing_file(self, app, client):
+        token = self.create_mock_token(app)
+        response = client.get('/api/repos/repos/myrepo/missing.txt/can_publish', headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        assert response.json['can_publish'] is False
+        assert response.json['error'] == 'File not found at path /repos/myrepo/missing.txt'
+
+    def test_can_publish_folder(self, app, client):
+        token = self.create_mock_token(app)
+        os.mkdir("/repos/myrepo/myfolder")
+
+        for path in ("/repos/myrepo", "/repos/myrepo/myfolder"):
+            response = client.get('/api/repos' + path + '/can_publish', headers={'X-Auth-Token': 'Bearer ' + token})
+
+            assert response.status_code == 200
+            assert response.json == {'path': path, 'repo': None, 'can_publish': False, 'error': 'Path must not be a folder'}
+
+    def test_can_publish_not_in_repo(self, app, client):
+        token = self.create_mock_token(app)
+        response = client.get('/api/repos/foo/bar/can_publish', headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 404
+        assert response.json == {'error': 'File /foo/bar is not in any publishable repository'}
+
+    def test_can_publish_batch(self, app, client):
+        token = self.create_mock_token(app)
+        data = {
+            'paths': [self.public_file, "/foo/bar", "/repos/myrepo"]
+        }
+        response = client.post('/api/repos/can_publish', json=data, headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        assert response.json['files'] == [
+            {'path': self.public_file, 'repo': '/repos/myrepo', 'can_publish': True, 'error': ''},
+            {'path': '/foo/bar', 'repo': None, 'can_publish': False, 'error': 'File not found at path /foo/bar'},
+            {'path': '/repos/myrepo', 'repo': None, 'can_publish': False, 'error': 'Path must not be a folder'}
+        ]
+
+    def test_can_publish_batch_invalid(self, app, client):
+        token = self.create_mock_token(app)
+        response = client.post('/api/repos/can_publish', json={'paths': self.public_file}, headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 400
+        assert response.json == {'error': 'paths must be a list of paths'}
+
+        response = client.post('/api/repos/can_publish', json=[self.public_file], headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 400
+        assert response.json == {'error': 'Body must be a JSON object'}
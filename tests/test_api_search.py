@@ -1,6 +1,7 @@
 import os
 import shutil
 
+from golink.db_models import PublishedFile
 from golink.extensions import db
 
 from . import GolinkTestCase
@@ -93,3 +94,51 @@ class TestApiSearch(GolinkTestCase):
             'status': "available",
             "tags": ["tag1"]
         }
+
+    def create_named_file(self, file_name):
+        file_id = self.create_mock_published_file("available")
+        PublishedFile.query.get(file_id).file_name = file_name
+        db.session.commit()
+        return file_id
+
+    def test_search_prefix(self, app, client):
+        file_1 = self.create_named_file("reads.fastq")
+        self.create_named_file("my_reads.fastq")
+
+        response = client.get("/api/search", query_string={'file': 'READS', 'match': 'prefix'})
+
+        assert response.status_code == 200
+        assert [file['uri'] for file in response.json['files']] == [file_1]
+
+    def test_search_escape(self, app, client):
+        file_1 = self.create_named_file("file_1.txt")
+        self.create_named_file("filex1.txt")
+
+        response = client.get("/api/search", query_string={'file': 'file_'})
+
+        assert response.status_code == 200
+        assert [file['uri'] for file in response.json['files']] == [file_1]
+
+    def test_search_relevance(self, app, client):
+        file_1 = self.create_named_file("reads.fastq")
+        file_2 = self.create_named_file("my_reads.fastq")
+        file_3 = self.create_named_file("reads.fastq.gz")
+
+        response = client.get("/api/search", query_string={'file': 'reads.fastq', 'sort': 'relevance'})
+
+        assert response.status_code == 200
+        assert [file['uri'] for file in response.json['files']] == [file_1, file_3, file_2]
+        assert response.json['next'] is None
+
+    def test_search_wrong_parameters(self, app, client):
+        response = client.get("/api/search", query_string={'file': 'reads', 'match': 'blabla'})
+        assert response.status_code == 400
+
+        response = client.get("/api/search", query_string={'file': 'reads', 'sort': 'blabla'})
+        assert response.status_code == 400
+
+        self.create_named_file("reads.fastq")
+        self.create_named_file("reads.fastq.gz")
+        response = client.get("/api/search", query_string={'file': 'reads', 'limit': 1})
+        response = client.get("/api/search", query_string={'file': 'reads', 'sort': 'relevance', 'cursor': response.json['next']})
+        assert response.status_code == 400
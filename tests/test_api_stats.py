@@ -0,0 +1,101 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from golink.db_models import DownloadEvent, DownloadStat
+from golink.extensions import db
+from golink.model.stats import rollup_downloads
+
+from . import GolinkTestCase
+
+
+class TestApiStats(GolinkTestCase):
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    def add_events(self, file_id, dates, size=10, partial=False):
+        for date in dates:
+            db.session.add(DownloadEvent(file_id=file_id, date=date, bytes=size, partial=partial))
+        db.session.commit()
+
+    def test_rollup(self, app, client):
+        file_id = self.create_mock_published_file("available")
+        day = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+        self.add_events(file_id, [day + timedelta(minutes=5), day + timedelta(minutes=50), day + timedelta(hours=2)])
+        self.add_events(file_id, [day + timedelta(minutes=10)], size=3, partial=True)
+
+        assert rollup_downloads(batch_size=3) == 4
+        assert DownloadEvent.query.count() == 0
+
+        response = client.get("/api/stats/" + file_id, query_string={'period': 'hour'})
+        assert response.status_code == 200
+        assert response.json['stats'] == [
+            {'date': day.strftime('%Y-%m-%d 12:00'), 'downloads': 3, 'bytes': 23, 'range_requests': 1},
+            {'date': day.strftime('%Y-%m-%d 14:00'), 'downloads': 1, 'bytes': 10, 'range_requests': 0}
+        ]
+
+        # Later events are added to the existing buckets
+        self.add_events(file_id, [day + timedelta(hours=3)])
+        assert rollup_downloads() == 1
+
+        response = client.get("/api/stats/" + file_id)
+        assert response.status_code == 200
+        assert response.json['stats'] == [
+            {'date': day.strftime('%Y-%m-%d'), 'downloads': 5, 'bytes': 43, 'range_requests': 1}
+        ]
+        assert DownloadStat.query.count() == 4
+
+    def test_download_stats(self, app, client):
+        file_id = self.create_mock_published_file("available")
+        size = os.path.getsize(self.public_file)
+
+        response = client.get("/api/download/" + file_id)
+        assert response.status_code == 200
+
+        event = DownloadEvent.query.one()
+        assert (str(event.file_id), event.bytes, event.partial) == (file_id, size, False)
+
+    def test_top(self, app, client):
+        file_1 = self.create_mock_published_file("available")
+        file_2 = self.create_mock_published_file("available")
+        file_3 = self.create_mock_published_file("unpublished")
+        now = datetime.utcnow()
+
+        self.add_events(file_1, [now])
+        self.add_events(file_2, [now, now])
+        self.add_events(file_3, [now, now, now])
+        # Too old
+        self.add_events(file_1, [now - timedelta(days=30)] * 5)
+        rollup_downloads()
+
+        response = client.get("/api/stats/top")
+        assert response.status_code == 200
+        assert [(file['uri'], file['downloads']) for file in response.json['files']] == [(file_2, 2), (file_1, 1)]
+
+        response = client.get("/api/stats/top", query_string={'duration': 60, 'limit': 1})
+        assert [(file['uri'], file['downloads']) for file in response.json['files']] == [(file_1, 6)]
+
+    def test_stats_wrong_parameters(self, app, client):
+        file_id = self.create_mock_published_file("available")
+
+        response = client.get("/api/stats/" + file_id, query_string={'period': 'year'})
+        assert response.status_code == 400
+
+        response = client.get("/api/stats/top", query_string={'period': 'year'})
+        assert response.status_code == 400
+
+        response = client.get("/api/stats/f2ecc13f-3038-4f78-8c84-ab881a0b567d")
+        assert response.status_code == 404
@@ -85,3 +85,100 @@ class TestApiTag(GolinkTestCase):
         # Assert tag removal
         assert response.status_code == 200
         assert response.json == {"tags": []}
+
+    def test_list_tags_counts(self, app, client):
+        self.create_mock_tag("unused")
+        self.create_mock_published_file("available", tags=["tag1", "other"])
+        self.create_mock_published_file("available", tags=["tag2"])
+        self.create_mock_published_file("available", tags=["tag1"])
+
+        response = client.get("/api/tag/list")
+        assert response.status_code == 200
+        assert response.json == {"tags": [
+            {"tag": "tag1", "count": 2},
+            {"tag": "other", "count": 1},
+            {"tag": "tag2", "count": 1},
+            {"tag": "unused", "count": 0}
+        ]}
+
+        response = client.get("/api/tag/list", query_string={"prefix": "TAG", "limit": 1})
+        assert response.status_code == 200
+        assert response.json == {"tags": [{"tag": "tag1", "count": 2}]}
+
+        response = client.get("/api/tag/list", query_string={"limit": "blabla"})
+        assert response.status_code == 400
+
+    def test_untag_shared(self, app, client):
+        file_id = self.create_mock_published_file("available", tags=["tag1", "tag2"])
+        self.create_mock_published_file("available", tags=["tag1"])
+        token = self.create_mock_token(app)
+
+        response = client.put("/api/tag/remove/" + file_id, json={'tags': ['tag1', 'tag2']}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 200
+        assert response.json['file']['tags'] == []
+
+        # tag2 has no file left
+        response = client.get("/api/tag/list")
+        assert response.json == {"tags": [{"tag": "tag1", "count": 1}]}
+
+    def test_bulk_tag_files(self, app, client):
+        file_id = self.create_mock_published_file("available", tags=["tag1"])
+        file_id2 = self.create_mock_published_file("available", tags=["tag2"])
+        token = self.create_mock_token(app)
+
+        data = {'files': [file_id, file_id2], 'add': ['Tag1', 'tag3'], 'remove': 'tag2'}
+        response = client.post("/api/tag/bulk", json=data, headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        assert response.json == {'files': 2, 'added': 3, 'removed': 1, 'deleted_tags': 1}
+
+        response = client.get("/api/tag/list")
+        assert response.json == {"tags": [{"tag": "tag1", "count": 2}, {"tag": "tag3", "count": 2}]}
+
+        response = client.post("/api/tag/bulk", json={'files': [file_id], 'add': 'tag1', 'remove': 'tag1'}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 400
+
+        response = client.post("/api/tag/bulk", json={'files': ["c4d5a0bf-3dd1-4ad2-9a4b-8d6b2f0c0e2e"], 'add': 'tag1'}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 404
+
+    def test_bulk_tag_not_object(self, app, client):
+        token = self.create_mock_token(app)
+
+        response = client.post("/api/tag/bulk", json=["tag1"], headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 400
+        assert response.json == {'error': 'Body must be a JSON object'}
+
+    def test_bulk_tag_wrong_owner(self, app, client):
+        file_id = self.create_mock_published_file("available")
+        token = self.create_mock_token(app, user="jdoe")
+
+        response = client.post("/api/tag/bulk", json={'files': [file_id], 'add': 'tag1'}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 401
+
+        # Files of other users are not selected by queries
+        response = client.post("/api/tag/bulk", json={'query': {'file': 'my_file'}, 'add': 'tag1'}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 200
+        assert response.json == {'files': 0, 'added': 0, 'removed': 0, 'deleted_tags': 0}
+
+    def test_bulk_tag_query(self, app, client):
+        self.create_mock_published_file("available", tags=["project1", "old"])
+        self.create_mock_published_file("available", tags=["project1"])
+        self.create_mock_published_file("available", tags=["project2", "old"])
+        token = self.create_mock_token(app)
+
+        data = {'query': {'tags': ['project1']}, 'add': ['new'], 'remove': ['old']}
+        response = client.post("/api/tag/bulk", json=data, headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        assert response.json == {'files': 2, 'added': 2, 'removed': 1, 'deleted_tags': 1}
+
+        response = client.get("/api/tag/list")
+        assert response.json == {"tags": [
+            {"tag": "new", "count": 2},
+            {"tag": "project1", "count": 2},
+            {"tag": "old", "count": 1},
+            {"tag": "project2", "count": 1}
+        ]}
+
+        response = client.post("/api/tag/bulk", json={'query': {}, 'add': ['new']}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 400
@@ -1,3 +1,8 @@
+import time
+from datetime import datetime, timedelta
+
+from golink.tokens import TokenCache
+
 import jwt
 
 from . import GolinkTestCase
@@ -69,3 +74,38 @@ class TestApiToken(GolinkTestCase):
 
         payload = jwt.decode(response.json.get("token"), app.config['SECRET_KEY'], algorithms=["HS256"])
         assert payload['username'] == "adminuser"
+
+    def test_token_cache(self, app, client):
+        """
+        Validated tokens are reused, and the user is not stored in the session cookie
+        """
+        token = self.create_mock_token(client.application, user="adminuser")
+        token_cache = client.application.token_cache
+        hits = token_cache.hits
+
+        for i in range(2):
+            response = client.get("/api/admin/cache", headers={'X-Auth-Token': 'Bearer ' + token})
+            assert response.status_code == 200
+            assert "Set-Cookie" not in response.headers
+
+        assert token_cache.hits == hits + 1
+
+        # Not admin
+        token = self.create_mock_token(client.application, user="root")
+        response = client.get("/api/admin/cache", headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 401
+
+    def test_token_cache_expiration(self, app, client):
+        """
+        Cached tokens are dropped when they expire
+        """
+        token = jwt.encode({"username": "root", "exp": datetime.utcnow() + timedelta(seconds=1)}, app.config['SECRET_KEY'], algorithm="HS256")
+        token_cache = TokenCache(app.config)
+
+        assert token_cache.validate(token) == {"valid": True, "username": "root", "is_admin": False}
+        assert token_cache.validate(token)["valid"]
+        assert token_cache.hits == 1
+
+        time.sleep(1.1)
+        assert token_cache.validate(token) == {"valid": False, "error": "Expired token"}
+        assert token_cache.validate("invalid") == {"valid": False, "error": "Invalid token"}
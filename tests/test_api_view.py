@@ -2,6 +2,7 @@ import os
 import shutil
 import tempfile
 
+from golink.db_models import PublishedFile
 from golink.extensions import db
 
 from . import GolinkTestCase
@@ -72,6 +73,19 @@ class TestApiView(GolinkTestCase):
             "version": 1
         }
 
+    def test_view_starting_file(self, app, client):
+        self.file_id = self.create_mock_published_file("starting")
+
+        url = "/api/view/" + self.file_id
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.json['file']['progress'] == {
+            "hashed_size": 0,
+            "throughput": None,
+            "eta": None
+        }
+
     def test_view_existing_file_with_siblings(self, app, client):
         file_ids = self.create_mock_published_dual_files("available")
         size = os.path.getsize(self.public_file)
@@ -148,6 +162,87 @@ class TestApiView(GolinkTestCase):
 
             assert self.md5(local_file) == self.md5(self.public_file)
 
+        db.session.remove()
+        assert PublishedFile.query.get(self.file_id).downloads == 1
+
+    def test_download_conditional(self, app, client):
+        self.file_id = self.create_mock_published_file("available")
+        etag = self.md5(self.public_file)
+
+        url = "/api/download/" + self.file_id
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] == '"%s"' % etag
+        assert response.headers['Accept-Ranges'] == "bytes"
+        last_modified = response.headers['Last-Modified']
+
+        # Not modified: answered without the file
+        os.remove(self.public_file)
+        response = client.get(url, headers={'If-None-Match': '"%s"' % etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == '"%s"' % etag
+
+        response = client.get(url, headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+        response = client.get(url, headers={'If-None-Match': '"anotherhash"'})
+        assert response.status_code == 404
+
+        db.session.remove()
+        assert PublishedFile.query.get(self.file_id).downloads == 1
+
+    def test_download_range(self, app, client):
+        self.file_id = self.create_mock_published_file("available")
+        etag = self.md5(self.public_file)
+        with open(self.public_file, "rb") as f:
+            content = f.read()
+
+        url = "/api/download/" + self.file_id
+        response = client.get(url, headers={'Range': 'bytes=2-5'})
+        assert response.status_code == 206
+        assert response.data == content[2:6]
+        assert response.headers['Content-Range'] == "bytes 2-5/%s" % len(content)
+
+        # Resume only if the file did not change
+        response = client.get(url, headers={'Range': 'bytes=2-', 'If-Range': '"%s"' % etag})
+        assert response.status_code == 206
+        assert response.data == content[2:]
+
+        response = client.get(url, headers={'Range': 'bytes=2-', 'If-Range': '"anotherhash"'})
+        assert response.status_code == 200
+        assert response.data == content
+
+        response = client.get(url, headers={'Range': 'bytes=%s-' % (len(content) + 10)})
+        assert response.status_code == 416
+
+    def test_download_multiple_ranges(self, app, client):
+        self.file_id = self.create_mock_published_file("available")
+        with open(self.public_file, "rb") as f:
+            content = f.read()
+        size = len(content)
+
+        url = "/api/download/" + self.file_id
+        response = client.get(url, headers={'Range': 'bytes=0-1,4-5,-2'})
+        assert response.status_code == 206
+
+        content_type = response.headers['Content-Type']
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1]
+        assert response.data == (
+            "--{b}\r\nContent-Type: text/plain\r\nContent-Range: bytes 0-1/{s}\r\n\r\n{p1}\r\n"
+            "--{b}\r\nContent-Type: text/plain\r\nContent-Range: bytes 4-5/{s}\r\n\r\n{p2}\r\n"
+            "--{b}\r\nContent-Type: text/plain\r\nContent-Range: bytes {e}-{l}/{s}\r\n\r\n{p3}\r\n"
+            "--{b}--\r\n"
+        ).format(b=boundary, s=size, e=size - 2, l=size - 1, p1=content[0:2].decode(), p2=content[4:6].decode(), p3=content[-2:].decode()).encode()
+        assert int(response.headers['Content-Length']) == len(response.data)
+
+        # Adjacent ranges are merged
+        response = client.get(url, headers={'Range': 'bytes=0-1,2-5'})
+        assert response.status_code == 206
+        assert response.data == content[0:6]
+        assert response.headers['Content-Range'] == "bytes 0-5/%s" % size
+
     def test_download_unpublished_file(self, app, client):
         file_id = self.create_mock_published_file("unpublished")
 
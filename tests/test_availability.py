@@ -0,0 +1,67 @@
+import os
+import shutil
+
+from golink.db_models import PublishedFile
+from golink.extensions import db
+from golink.model.availability import scan_availability
+
+from . import GolinkTestCase
+
+
+class TestAvailability(GolinkTestCase):
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    def get_status(self, file_id):
+        db.session.remove()
+        return PublishedFile.query.get(file_id).status
+
+    def test_scan_availability(self, app, client):
+        available = self.create_mock_published_file("available")
+        unavailable = self.create_mock_published_file("unavailable")
+        pulling = self.create_mock_published_file("pulling")
+        starting = self.create_mock_published_file("starting")
+
+        assert scan_availability(batch_size=2) == {"available": 2}
+        assert self.get_status(available) == "available"
+        assert self.get_status(unavailable) == "available"
+        assert self.get_status(pulling) == "available"
+        assert self.get_status(starting) == "starting"
+
+        os.remove(self.public_file)
+
+        assert scan_availability() == {"unavailable": 3}
+        assert self.get_status(available) == "unavailable"
+        assert self.get_status(starting) == "starting"
+
+    def test_scan_pulling_file(self, app, client):
+        pulling = self.create_mock_published_file("pulling")
+
+        # Not completely pulled yet
+        with open(self.public_file, "a") as f:
+            f.write("more")
+
+        assert scan_availability() == {}
+        assert self.get_status(pulling) == "pulling"
+
+    def test_view_does_not_check_disk(self, app, client):
+        file_id = self.create_mock_published_file("available")
+        os.remove(self.public_file)
+
+        response = client.get("/api/view/" + file_id)
+
+        assert response.status_code == 200
+        assert response.json['file']['status'] == "available"
+        assert self.get_status(file_id) == "available"
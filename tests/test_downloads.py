@@ -0,0 +1,60 @@
+import os
+import shutil
+
+from golink.db_models import PublishedFile
+from golink.downloads import DownloadCounter
+from golink.extensions import db
+
+from . import GolinkTestCase
+
+
+class TestDownloadCounter(GolinkTestCase):
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    def get_downloads(self, file_id):
+        db.session.remove()
+        return PublishedFile.query.get(file_id).downloads
+
+    def test_buffered_downloads(self, app, client):
+        file_1 = self.create_mock_published_file("available")
+        file_2 = self.create_mock_published_file("available")
+
+        app.config["DOWNLOAD_FLUSH_INTERVAL"] = 3600
+        counter = DownloadCounter(app)
+        for i in range(3):
+            counter.record(file_1)
+        counter.record(file_2)
+        counter.record(file_2)
+
+        assert self.get_downloads(file_1) == 0
+
+        assert counter.flush() == 2
+        assert self.get_downloads(file_1) == 3
+        assert self.get_downloads(file_2) == 2
+
+        # Nothing left to write
+        assert counter.flush() == 0
+        assert self.get_downloads(file_1) == 3
+
+    def test_unbuffered_downloads(self, app, client):
+        file_id = self.create_mock_published_file("available")
+
+        app.config["DOWNLOAD_FLUSH_INTERVAL"] = 0
+        counter = DownloadCounter(app)
+        counter.record(file_id)
+        counter.record(file_id)
+
+        assert self.get_downloads(file_id) == 2
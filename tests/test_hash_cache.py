@@ -0,0 +1,71 @@
+import os
+import shutil
+
+from golink.extensions import db
+from golink.model.hash_cache import get_cached_hash, get_hash_cache_stats, store_hash
+
+from . import GolinkTestCase
+
+
+class TestHashCache(GolinkTestCase):
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    def test_cache_miss(self, app, client):
+        assert get_cached_hash(os.stat(self.public_file), ["md5"]) is None
+
+    def test_cache_hit(self, app, client):
+        file_stat = os.stat(self.public_file)
+        store_hash(file_stat, {"md5": self.md5(self.public_file)})
+
+        entry = get_cached_hash(os.stat(self.public_file), ["md5"])
+
+        assert entry.hash == self.md5(self.public_file)
+        assert get_hash_cache_stats() == {"entries": 1, "hits": 1, "misses": 1, "invalidations": 0}
+
+    def test_cache_missing_algorithm(self, app, client):
+        store_hash(os.stat(self.public_file), {"md5": self.md5(self.public_file)})
+
+        assert get_cached_hash(os.stat(self.public_file), ["md5", "sha256"]) is None
+
+    def test_cache_invalidation(self, app, client):
+        store_hash(os.stat(self.public_file), {"md5": self.md5(self.public_file)})
+
+        with open(self.public_file, "a") as f:
+            f.write("some more content")
+
+        assert get_cached_hash(os.stat(self.public_file), ["md5"]) is None
+        # The entry and its counters are kept
+        assert get_hash_cache_stats() == {"entries": 1, "hits": 0, "misses": 1, "invalidations": 1}
+
+        # Updated in place once hashed again
+        store_hash(os.stat(self.public_file), {"md5": self.md5(self.public_file)})
+        assert get_cached_hash(os.stat(self.public_file), ["md5"]).hash == self.md5(self.public_file)
+        assert get_hash_cache_stats() == {"entries": 1, "hits": 1, "misses": 2, "invalidations": 1}
+
+    def test_cache_stats_not_admin(self, app, client):
+        token = self.create_mock_token(app)
+
+        response = client.get("/api/admin/hash_cache", headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 401
+
+    def test_cache_stats(self, app, client):
+        token = self.create_mock_token(app, user="adminuser")
+
+        response = client.get("/api/admin/hash_cache", headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        assert response.json == {"entries": 0, "hits": 0, "misses": 0, "invalidations": 0}
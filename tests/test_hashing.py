@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+
+from golink.app import create_app
+from golink.hashing import ResumableHash, check_algorithms, hash_file, is_resumable
+
+import pytest
+
+from . import GolinkTestCase
+
+
+class TestHashing(GolinkTestCase):
+
+    def test_hash_md5(self):
+        with tempfile.TemporaryDirectory() as local_path:
+            local_file = local_path + '/myfile'
+            with open(local_file, "wb") as f:
+                f.write(os.urandom(100000))
+
+            digests = hash_file(local_file, buffer_size=4096)
+
+            assert digests == {"md5": self.md5(local_file)}
+
+    def test_hash_multiple_algorithms(self):
+        with tempfile.TemporaryDirectory() as local_path:
+            local_file = local_path + '/myfile'
+            content = os.urandom(100000)
+            with open(local_file, "wb") as f:
+                f.write(content)
+
+            processed = []
+            digests = hash_file(local_file, algorithms=["md5", "sha256", "blake2b"], buffer_size=3000, callback=processed.append)
+
+            assert digests == {
+                "md5": hashlib.md5(content).hexdigest(),
+                "sha256": hashlib.sha256(content).hexdigest(),
+                "blake2b": hashlib.blake2b(content).hexdigest()
+            }
+            assert sum(processed) == len(content)
+
+    def test_hash_empty_file(self):
+        with tempfile.TemporaryDirectory() as local_path:
+            local_file = local_path + '/myfile'
+            open(local_file, "wb").close()
+
+            assert hash_file(local_file) == {"md5": hashlib.md5(b"").hexdigest()}
+
+    def test_hash_unknown_algorithm(self):
+        with tempfile.TemporaryDirectory() as local_path:
+            local_file = local_path + '/myfile'
+            open(local_file, "wb").close()
+
+            with pytest.raises(ValueError):
+                hash_file(local_file, algorithms=["notanalgorithm"])
+
+    def test_check_algorithms(self):
+        assert check_algorithms(["MD5", "sha256"]) == ["md5", "sha256"]
+
+        for algorithms in (["notanalgorithm"], ["md5", "shake_128"], ["shake_256"], [], "md5"):
+            with pytest.raises(ValueError):
+                check_algorithms(algorithms)
+
+    def test_app_rejects_variable_length_digest(self):
+        with tempfile.TemporaryDirectory() as local_path:
+            config_file = local_path + '/golink.cfg'
+            with open(config_file, "w") as f:
+                f.write('HASH_ALGORITHMS = ["md5", "shake_128"]\n')
+
+            with pytest.raises(ValueError, match="shake_128"):
+                create_app(config=config_file, run_mode='test')
+
+    def test_hash_segments(self):
+        with tempfile.TemporaryDirectory() as local_path:
+            local_file = local_path + '/myfile'
+            content = os.urandom(10000)
+            with open(local_file, "wb") as f:
+                f.write(content)
+
+            segments = [hash_file(local_file, buffer_size=1000, offset=offset, length=4000) for offset in range(0, 10000, 4000)]
+
+            assert segments == [{"md5": hashlib.md5(content[offset:offset + 4000]).hexdigest()} for offset in range(0, 10000, 4000)]
+
+    @pytest.mark.skipif(not is_resumable("md5"), reason="libcrypto is not available")
+    def test_hash_resume(self):
+        with tempfile.TemporaryDirectory() as local_path:
+            local_file = local_path + '/myfile'
+            content = os.urandom(10000)
+            with open(local_file, "wb") as f:
+                f.write(content)
+
+            hashers = {"md5": ResumableHash("md5"), "sha256": ResumableHash("sha256")}
+            for offset in range(0, 10000, 4000):
+                hash_file(local_file, buffer_size=1000, offset=offset, length=4000, hashers=hashers)
+                # As if the task was restarted from the saved state
+                hashers = dict((algorithm, ResumableHash(algorithm, state=hasher.get_state())) for algorithm, hasher in hashers.items())
+
+            # The digests of the whole file, not of its parts
+            assert dict((algorithm, hasher.hexdigest()) for algorithm, hasher in hashers.items()) == {
+                "md5": hashlib.md5(content).hexdigest(),
+                "sha256": hashlib.sha256(content).hexdigest()
+            }
+
+    def test_hash_resume_unsupported(self):
+        assert not is_resumable("blake2b")
+
+        with pytest.raises(ValueError):
+            ResumableHash("blake2b")
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+from . import GolinkTestCase
+
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Only imported when needed
+DEFERRED_MODULES = ("alembic", "email_validator", "flask_migrate", "jwt", "ldap3", "requests")
+
+# Cold import budget, in milliseconds (generous: the deferred modules check is the precise one)
+IMPORT_BUDGET = int(os.getenv("GOLINK_IMPORT_BUDGET", 3000))
+
+
+def cold_import(module):
+    """
+    Import module in a new interpreter, with -X importtime
+
+    Returns (cumulative import time of module in ms, deferred modules that were imported)
+    """
+    code = "import sys, %s; print(','.join(m for m in %r if m in sys.modules))" % (module, DEFERRED_MODULES)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    cumulative = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if parts[-1].strip() == module:
+            cumulative = int(parts[1]) / 1000
+
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative, loaded
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime requires python 3.7")
+class TestImportTime(GolinkTestCase):
+
+    def test_import_app(self):
+        duration, loaded = cold_import("golink.app")
+
+        assert loaded == []
+        assert duration < IMPORT_BUDGET, "Importing golink.app took %s ms" % duration
+
+    @pytest.mark.skipif(not os.path.exists(os.path.join(ROOT_DIR, "local.cfg")), reason="golink.tasks loads local.cfg")
+    def test_import_tasks(self):
+        duration, loaded = cold_import("golink.tasks")
+
+        assert loaded == []
+        assert duration < IMPORT_BUDGET, "Importing golink.tasks took %s ms" % duration
+
+    def test_worker_skips_ldap(self):
+        # A prod worker app must not import ldap3, even after its probes ran
+        code = "\n".join([
+            "import sys",
+            "from golink.app import create_app",
+            "app = create_app(run_mode='prod', is_worker=True)",
+            "[probe.wait(10) for probe in app.probes.values()]",
+            "print(sorted(app.probes), 'ldap3' in sys.modules)"
+        ])
+        with tempfile.TemporaryDirectory() as local_path:
+            env = dict(os.environ, LDAP_HOST="localhost", LDAP_BASE_QUERY="dc=example,dc=org", TASK_LOG_DIR=local_path, LOG_FOLDER=local_path, MAIL_SERVER="localhost", MAIL_SENDER="golink@example.org", MAIL_ADMIN="admin@example.org")
+            result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert result.stdout.strip().splitlines()[-1] == "[] False"
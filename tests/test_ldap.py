@@ -0,0 +1,73 @@
+from golink.ldap_client import LdapClient
+
+from ldap3 import MOCK_SYNC
+
+from . import GolinkTestCase
+
+
+class TestLdapClient(GolinkTestCase):
+
+    def create_client(self):
+        config = {"LDAP_HOST": "mock-ldap", "LDAP_BASE_QUERY": "dc=example,dc=org", "LDAP_CACHE_TTL": 300, "LDAP_POOL_SIZE": 2}
+        client = LdapClient(config, client_strategy=MOCK_SYNC)
+
+        with client.connection() as conn:
+            conn.strategy.add_entry("uid=jdoe,ou=People,dc=example,dc=org", {"uid": "jdoe", "uidNumber": 1001, "userPassword": "secret", "objectClass": "posixAccount"})
+            conn.strategy.add_entry("cn=genomics,ou=Groups,dc=example,dc=org", {"cn": "genomics", "gidNumber": 2001, "memberUid": ["jdoe"], "objectClass": "posixGroup"})
+            conn.strategy.add_entry("cn=admins,ou=Groups,dc=example,dc=org", {"cn": "admins", "gidNumber": 2002, "memberUid": ["root"], "objectClass": "posixGroup"})
+        return client
+
+    def test_get_user_data(self):
+        client = self.create_client()
+
+        data = client.get_user_data("jdoe")
+        assert data["error"] is None
+        assert data["user_id"] == "1001"
+        assert data["user_group_names"] == ["genomics"]
+        assert data["user_group_ids"] == ["2001"]
+
+        # Unknown users are not cached
+        assert client.get_user_data("nobody")["error"] == "Could not find user nobody in LDAP"
+        assert client.get_user_data("nobody*")["error"] == "Could not find user nobody* in LDAP"
+        assert client.misses == 3
+
+        # Served from the cache, without any LDAP request
+        def no_connection():
+            raise AssertionError("LDAP queried")
+        client.connection = no_connection
+
+        assert client.get_user_data("jdoe") == data
+        assert client.hits == 1
+
+    def test_get_identity(self):
+        client = self.create_client()
+
+        identity = client.get_identity("jdoe")
+        assert identity.error is None
+        assert identity.dn == "uid=jdoe,ou=People,dc=example,dc=org"
+        assert identity.groups == frozenset(["genomics", "2001"])
+
+        # The same (immutable) identity is shared by all the requests
+        assert client.get_identity("jdoe") is identity
+
+    def test_connection_pool(self):
+        client = self.create_client()
+
+        client.get_user_data("jdoe")
+        client.clear_cache()
+        client.get_user_data("jdoe")
+
+        # The same connection was reused
+        assert client._pool.qsize() == 1
+
+    def test_authenticate(self):
+        client = self.create_client()
+
+        assert client.authenticate("jdoe", "secret")
+        assert not client.authenticate("jdoe", "wrong")
+        assert not client.authenticate("jdoe", "")
+        assert not client.authenticate("nobody", "secret")
+        # Pooled connections are still anonymous
+        assert client._pool.qsize() == 1
+        with client.connection() as conn:
+            assert conn.user is None
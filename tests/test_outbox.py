@@ -0,0 +1,62 @@
+from golink.db_models import TaskOutbox
+from golink.extensions import db
+from golink.model.outbox import dispatch_outbox, enqueue_task
+
+from . import GolinkTestCase
+
+
+class TestOutbox(GolinkTestCase):
+
+    def teardown_method(self):
+        db.session.remove()
+        db.drop_all()
+
+    def mock_send_task(self, app, monkeypatch, fail=False):
+        sent = []
+
+        def send_task(name, args):
+            if fail:
+                raise ConnectionError("Broker unavailable")
+            sent.append((name, list(args)))
+
+        monkeypatch.setattr(app.celery, "send_task", send_task)
+        return sent
+
+    def test_send_after_commit(self, app, client, monkeypatch):
+        sent = self.mock_send_task(app, monkeypatch)
+
+        enqueue_task("publish", ("some_id", "/some/path", ""))
+        assert sent == []
+
+        db.session.commit()
+
+        assert sent == [("publish", ["some_id", "/some/path", ""])]
+        assert TaskOutbox.query.count() == 0
+
+    def test_discard_on_rollback(self, app, client, monkeypatch):
+        sent = self.mock_send_task(app, monkeypatch)
+
+        enqueue_task("publish", ("some_id", "/some/path", ""))
+        db.session.rollback()
+        db.session.commit()
+
+        assert sent == []
+        assert TaskOutbox.query.count() == 0
+
+    def test_dispatch_unsent(self, app, client, monkeypatch):
+        self.mock_send_task(app, monkeypatch, fail=True)
+
+        enqueue_task("publish", ("some_id", "/some/path", ""))
+        db.session.commit()
+
+        assert TaskOutbox.query.count() == 1
+
+        sent = self.mock_send_task(app, monkeypatch)
+        assert dispatch_outbox() == 1
+        assert sent == [("publish", ["some_id", "/some/path", ""])]
+        assert TaskOutbox.query.count() == 0
+
+    def test_visibility_timeout(self, app):
+        # Late acknowledged tasks are not delivered again while running
+        assert app.celery.conf.BROKER_TRANSPORT_OPTIONS['visibility_timeout'] == app.config['TASK_VISIBILITY_TIMEOUT']
+        assert app.config['TASK_VISIBILITY_TIMEOUT'] > 3600
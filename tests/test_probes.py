@@ -0,0 +1,66 @@
+import time
+
+from golink.probes import DependencyProbe
+
+from . import GolinkTestCase
+
+
+class TestProbes(GolinkTestCase):
+
+    def test_probe_background(self):
+        results = []
+
+        def slow_check():
+            time.sleep(0.5)
+            return True
+
+        probe = DependencyProbe("slow", slow_check, interval=3600, on_result=results.append)
+
+        start = time.monotonic()
+        assert probe.get() is None
+        assert time.monotonic() - start < 0.2
+
+        assert probe.wait(5)
+        assert probe.get() is True
+        assert results == [True]
+        assert probe.status()['available'] is True
+        assert probe.status()['checks'] == 1
+
+    def test_probe_failure(self):
+        def failing_check():
+            raise ConnectionError("Connection refused")
+
+        probe = DependencyProbe("failing", failing_check, interval=0)
+        probe.start()
+        assert probe.wait(5)
+
+        assert probe.result is False
+        assert probe.status()['error'] == "Connection refused"
+
+        # Outdated: checked again
+        probe.get()
+        assert probe.wait(5)
+        assert probe.checks == 2
+
+    def test_baricadr_probe(self, app):
+        conf = {
+            '/repos/myrepo': {
+                'has_baricadr': True
+            }
+        }
+        app.repos.read_conf_from_str(str(conf))
+        repo = app.repos.get_repo("/repos/myrepo/file.txt")
+
+        # Baricadr is not enabled in the test configuration
+        assert not repo.has_baricadr
+
+        probe = DependencyProbe("Baricadr", lambda: True, interval=3600, on_result=lambda result: setattr(app, "baricadr_enabled", result))
+        app.probes["baricadr"] = probe
+        probe.start()
+        assert probe.wait(5)
+
+        assert app.baricadr_enabled
+        assert repo.has_baricadr
+
+    def test_startup_timings(self, app):
+        assert list(app.startup_timings) == ["config", "dependencies", "repos", "blueprints", "extensions", "logging", "services", "probes"]
@@ -2,6 +2,9 @@ import os
 import shutil
 import tempfile
 
+from golink.ldap_client import UserIdentity
+from golink.model.repos import Repos
+
 import pytest
 
 from . import GolinkTestCase
@@ -9,7 +12,7 @@ from . import GolinkTestCase
 
 class TestRepos(GolinkTestCase):
 
-    temp_paths = ["/foo/bar/", "/repos/some/local/path/"]
+    temp_paths = ["/foo/bar/", "/foo/barbaz/", "/repos/some/local/path/"]
 
     def setup_method(self):
         for path in self.temp_paths:
@@ -92,3 +95,130 @@ class TestRepos(GolinkTestCase):
             app.repos.read_conf_from_str(str(conf))
 
             assert os.path.exists(local_path_not_exist)
+
+    def test_get_repo(self, app):
+        conf = {
+            '/foo/bar': {},
+            '/foo/barbaz/some': {}
+        }
+
+        app.repos.read_conf_from_str(str(conf))
+
+        assert app.repos.get_repo("/foo/bar").local_path == "/foo/bar"
+        assert app.repos.get_repo("/foo/bar/some/file.txt").local_path == "/foo/bar"
+        assert app.repos.get_repo("/foo/barbaz/some/file.txt").local_path == "/foo/barbaz/some"
+        assert not app.repos.get_repo("/foo/barbaz/file.txt")
+        assert not app.repos.get_repo("/foo")
+
+    def test_overlap_message(self, app):
+        conf = {
+            '/foo/bar/some/thing': {},
+            '/foo/barbaz': {},
+            '/foo/bar': {}
+        }
+
+        with pytest.raises(ValueError, match='"/foo/bar", conflicting with "/foo/bar/some/thing"'):
+            app.repos.do_read_conf(str(conf))
+
+    def test_reload(self, app):
+        with tempfile.TemporaryDirectory() as local_path:
+            conf_file = os.path.join(local_path, "repos.yml")
+            with open(conf_file, "w") as f:
+                f.write("%s/repo1: {}\n" % local_path)
+
+            repos = Repos(conf_file)
+            index = repos.index
+            assert repos.generation == 1
+            assert not repos.reload_if_changed(force=True)
+
+            with open(conf_file, "w") as f:
+                f.write("%s/repo1: {}\n%s/repo2: {}\n" % (local_path, local_path))
+
+            assert repos.reload_if_changed(force=True)
+            assert repos.index is not index
+            assert repos.get_repo(local_path + "/repo2/file.txt").local_path == local_path + "/repo2"
+            assert repos.stats()["generation"] == 2
+            assert repos.stats()["reloads"] == 1
+
+            # Overlapping repositories: the previous ones are kept
+            with open(conf_file, "w") as f:
+                f.write("%s/repo1: {}\n%s/repo1/sub: {}\n" % (local_path, local_path))
+
+            assert not repos.reload_if_changed(force=True)
+            assert repos.get_repo(local_path + "/repo2/file.txt").local_path == local_path + "/repo2"
+            stats = repos.stats()
+            assert stats["generation"] == 2
+            assert stats["reload_errors"] == 1
+            assert "conflicting with" in stats["last_error"]
+            assert stats["repositories"] == 2
+
+    def test_reload_interval(self, app):
+        with tempfile.TemporaryDirectory() as local_path:
+            conf_file = os.path.join(local_path, "repos.yml")
+            with open(conf_file, "w") as f:
+                f.write("%s/repo1: {}\n" % local_path)
+
+            repos = Repos(conf_file, reload_interval=3600)
+            with open(conf_file, "w") as f:
+                f.write("%s/repo2: {}\n" % local_path)
+
+            # Not checked yet
+            assert not repos.get_repo(local_path + "/repo2/file.txt")
+            assert repos.reload_if_changed(force=True)
+            assert repos.get_repo(local_path + "/repo2/file.txt")
+
+    def test_acl(self, app):
+        conf = {
+            '/foo/bar': {
+                'allowed_users': ['jdoe', 1002],
+                'allowed_groups': ['genomics', 3000]
+            },
+            '/foo/barbaz': {}
+        }
+
+        app.repos.read_conf_from_str(str(conf))
+        repo = app.repos.get_repo("/foo/bar")
+        assert repo.acl_users == frozenset(["jdoe", "1002"])
+        assert repo.acl_groups == frozenset(["genomics", "3000"])
+        assert not repo.owner_can_publish
+        assert app.repos.get_repo("/foo/barbaz").owner_can_publish
+
+        assert repo.acl_allows(UserIdentity("jdoe", "1001", None, (), (), frozenset(), None))
+        assert repo.acl_allows(UserIdentity("someone", "1002", None, (), (), frozenset(), None))
+        assert repo.acl_allows(UserIdentity("someone", "1003", None, ("genomics",), ("2001",), frozenset(["genomics", "2001"]), None))
+        assert repo.acl_allows(UserIdentity("someone", "1003", None, ("other",), ("3000",), frozenset(["other", "3000"]), None))
+        assert not repo.acl_allows(UserIdentity("someone", "1003", None, ("other",), ("2002",), frozenset(["other", "2002"]), None))
+
+    def test_check_publish_file(self, app):
+        conf = {
+            '/foo/bar': {
+                'allowed_users': ['jdoe'],
+                'allowed_groups': ['genomics']
+            },
+            '/foo/barbaz': {}
+        }
+
+        app.repos.read_conf_from_str(str(conf))
+        for path in ("/foo/bar/file.txt", "/foo/barbaz/file.txt"):
+            with open(path, "w") as f:
+                f.write("data")
+
+        owner_id = str(os.stat("/foo/barbaz/file.txt").st_uid)
+        owner = UserIdentity("owner", owner_id, None, (), (), frozenset(), None)
+        stranger = UserIdentity("stranger", "-1", None, (), (), frozenset(), None)
+        user_data = {"username": "owner", "is_admin": False}
+
+        app.config['GOLINK_RUN_MODE'] = "prod"
+        try:
+            restricted = app.repos.get_repo("/foo/bar")
+            assert restricted.check_publish_file("/foo/bar/file.txt", user_data, identity=owner)["error"] == "User owner does not have permission to publish this file on this repository"
+            assert restricted.check_publish_file("/foo/bar/file.txt", {"username": "owner", "is_admin": True}, identity=owner)["available"]
+
+            open_repo = app.repos.get_repo("/foo/barbaz")
+            assert open_repo.check_publish_file("/foo/barbaz/file.txt", user_data, identity=owner)["available"]
+            assert not open_repo.check_publish_file("/foo/barbaz/file.txt", {"username": "stranger", "is_admin": False}, identity=stranger)["available"]
+
+            error = UserIdentity("nobody", None, None, (), (), frozenset(), "Could not find user nobody in LDAP")
+            assert open_repo.check_publish_file("/foo/barbaz/file.txt", user_data, identity=error) == {"available": False, "error": "Could not find user nobody in LDAP"}
+        finally:
+            app.config['GOLINK_RUN_MODE'] = "test"
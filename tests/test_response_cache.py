@@ -0,0 +1,185 @@
+import os
+import shutil
+
+from golink.cache import FILE_LISTINGS, LISTINGS, ResponseCache
+from golink.db_models import PublishedFile
+from golink.extensions import db
+
+from werkzeug.datastructures import MultiDict
+
+import pytest
+
+from . import GolinkTestCase
+
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+class TestResponseCache(GolinkTestCase):
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    def test_key_normalization(self, app, client):
+        cache = ResponseCache({"RESPONSE_CACHE": "memory", "RESPONSE_CACHE_SHARED": False})
+
+        key = cache.make_key("list", MultiDict([("tags", "b"), ("limit", "10"), ("tags", "A ")]))
+        assert key == cache.make_key("list", MultiDict([("limit", "10"), ("tags", "a"), ("tags", "b")]))
+        assert key != cache.make_key("list", MultiDict([("limit", "20"), ("tags", "a"), ("tags", "b")]))
+
+        cache.invalidate()
+        assert key != cache.make_key("list", MultiDict([("limit", "10"), ("tags", "a"), ("tags", "b")]))
+
+    def test_invalidation_scope(self, app, client):
+        cache = ResponseCache({"RESPONSE_CACHE": "memory", "RESPONSE_CACHE_SHARED": False})
+        file_ids = ["4ecf1c84-509b-4be0-85a8-a2bc01ea9324", "a7fa028d-3b39-4398-9b1b-abdd1a4fcffe"]
+
+        def keys():
+            return [cache.make_key("view", MultiDict(), file_id=file_id) for file_id in file_ids] + [cache.make_key(name, MultiDict()) for name in LISTINGS]
+
+        before = keys()
+        # Hashing progress: only the file view
+        cache.invalidate([file_ids[0]], listings=())
+        after = keys()
+        assert [key != previous for key, previous in zip(after, before)] == [True, False, False, False, False]
+
+        # Status change: the view and the listings showing it, not the tag counts
+        cache.invalidate([file_ids[1]], listings=FILE_LISTINGS)
+        assert [key != previous for key, previous in zip(keys(), after)] == [False, True, True, True, False]
+
+    def test_lru(self, app, client):
+        cache = ResponseCache({"RESPONSE_CACHE": "memory", "RESPONSE_CACHE_SHARED": False, "RESPONSE_CACHE_MAX_ENTRIES": 2})
+
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['entries'] == 2
+
+    def test_cached_view(self, app, client):
+        cache = client.application.response_cache
+        file_id = self.create_mock_published_file("available")
+        url = "/api/view/" + file_id
+
+        response = client.get(url)
+        assert response.headers['X-Cache'] == "MISS"
+
+        # Changed behind the cache's back
+        PublishedFile.query.get(file_id).contact = "someone@example.com"
+        db.session.commit()
+
+        response = client.get(url)
+        assert response.headers['X-Cache'] == "HIT"
+        assert response.json['file']['contact'] is None
+
+        # Changed through the API
+        token = self.create_mock_token(app)
+        response = client.put("/api/tag/add/" + file_id, json={'tags': ['tag1']}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 200
+
+        response = client.get(url)
+        assert response.headers['X-Cache'] == "MISS"
+        assert response.json['file']['tags'] == ['tag1']
+        assert response.json['file']['contact'] == "someone@example.com"
+
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+
+    def test_cached_listings(self, app, client):
+        file_id = self.create_mock_published_file("available")
+
+        for url in ("/api/list", "/api/search?file=my_file", "/api/tag/list"):
+            assert client.get(url).headers['X-Cache'] == "MISS"
+            assert client.get(url).headers['X-Cache'] == "HIT"
+
+        token = self.create_mock_token(app)
+        response = client.delete("/api/unpublish/" + file_id, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 200
+
+        response = client.get("/api/list")
+        assert response.headers['X-Cache'] == "MISS"
+        assert response.json['files'] == []
+
+    def test_sibling_views(self, app, client):
+        file_ids = self.create_mock_published_dual_files("available")
+
+        response = client.get("/api/view/" + file_ids[0])
+        assert response.json['file']['siblings'][0]['status'] == "available"
+
+        token = self.create_mock_token(app)
+        response = client.delete("/api/unpublish/" + file_ids[1], headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 200
+
+        response = client.get("/api/view/" + file_ids[0])
+        assert response.headers['X-Cache'] == "MISS"
+        assert response.json['file']['siblings'][0]['status'] == "unpublished"
+
+    def test_cache_stats(self, app, client):
+
+        token = self.create_mock_token(app, user="adminuser")
+        response = client.get("/api/admin/cache", headers={'X-Auth-Token': 'Bearer ' + token})
+
+        assert response.status_code == 200
+        assert response.json['backend'] == "memory"
+        assert response.json['enabled'] is True
+
+    def test_worker_invalidation(self, app, client):
+        cache = client.application.response_cache
+        file_id = self.create_mock_published_file("starting")
+        url = "/api/view/" + file_id
+
+        assert client.get(url).headers['X-Cache'] == "MISS"
+        assert client.get(url).headers['X-Cache'] == "HIT"
+
+        # Workers do not cache responses, but invalidate those of the web processes (through the shared versions)
+        worker_cache = ResponseCache(dict(client.application.config), is_worker=True)
+        assert not worker_cache.enabled
+        worker_cache.versions = cache.versions
+
+        PublishedFile.query.get(file_id).status = "available"
+        db.session.commit()
+        worker_cache.invalidate_files([file_id], listings=FILE_LISTINGS)
+
+        response = client.get(url)
+        assert response.headers['X-Cache'] == "MISS"
+        assert response.json['file']['status'] == "available"
+
+    @pytest.mark.skipif(not os.path.exists(os.path.join(ROOT_DIR, "local.cfg")), reason="golink.tasks loads local.cfg")
+    def test_publish_task_invalidation(self, app, client):
+        from golink import tasks
+
+        # The worker and a web process, sharing the invalidations through redis
+        config = dict(tasks.app.config, RESPONSE_CACHE="memory", RESPONSE_CACHE_SHARED=True)
+        client.application.response_cache = ResponseCache(config)
+        worker_cache = tasks.app.response_cache
+        tasks.app.response_cache = ResponseCache(config, is_worker=True)
+
+        file_id = self.create_mock_published_file("starting")
+        url = "/api/view/" + file_id
+
+        assert client.get(url).headers['X-Cache'] == "MISS"
+        assert client.get(url).headers['X-Cache'] == "HIT"
+
+        try:
+            tasks.publish_file(file_id, self.public_file)
+        finally:
+            tasks.app.response_cache = worker_cache
+
+        response = client.get(url)
+        assert response.headers['X-Cache'] == "MISS"
+        assert response.json['file']['status'] == "available"
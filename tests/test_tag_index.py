@@ -0,0 +1,81 @@
+import os
+import shutil
+
+from golink.extensions import db
+from golink.tag_index import TagIndex
+
+from . import GolinkTestCase
+
+
+class TestTagIndex(GolinkTestCase):
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    def test_suggest(self, app, client):
+        index = TagIndex()
+        index.build({"genome": 3, "genes": 5, "gene": 5, "rna": 1, "genomics": 0})
+
+        assert index.suggest("") == [("gene", 5), ("genes", 5), ("genome", 3), ("rna", 1), ("genomics", 0)]
+        assert index.suggest("g", limit=2) == [("gene", 5), ("genes", 5)]
+        assert index.suggest("genom") == [("genome", 3), ("genomics", 0)]
+        assert index.suggest("dna") == []
+
+    def test_update(self, app, client):
+        index = TagIndex()
+        index.build({"genome": 3, "gene": 5})
+
+        index.update({"genome": 3, "gff": 1})
+        assert index.suggest("g") == [("genome", 6), ("gene", 5), ("gff", 1)]
+        assert index.suggest("gf") == [("gff", 1)]
+
+        index.remove(["gene", "unknown"])
+        assert index.suggest("ge") == [("genome", 6)]
+        assert index.suggest("gene") == []
+
+    def test_api_suggest(self, app, client):
+        self.create_mock_published_file("available", tags=["genome"])
+        file_id = self.create_mock_published_file("available", tags=["gene"])
+        self.create_mock_published_file("available", tags=["gene"])
+
+        response = client.get("/api/tag/suggest", query_string={"prefix": "GEN"})
+        assert response.status_code == 200
+        assert response.json == {"tags": [{"tag": "gene", "count": 2}, {"tag": "genome", "count": 1}]}
+
+        # Updated in place
+        token = self.create_mock_token(app)
+        response = client.put("/api/tag/add/" + file_id, json={'tags': ['genomics']}, headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 200
+
+        response = client.get("/api/tag/suggest", query_string={"prefix": "genom", "limit": 1})
+        assert response.status_code == 200
+        assert response.json == {"tags": [{"tag": "genome", "count": 1}]}
+
+        response = client.get("/api/tag/suggest", query_string={"prefix": "genomi"})
+        assert response.json == {"tags": [{"tag": "genomics", "count": 1}]}
+
+        response = client.get("/api/tag/suggest", query_string={"limit": "blabla"})
+        assert response.status_code == 400
+
+    def test_update_precomputed(self, app, client):
+        index = TagIndex(max_results=3)
+        index.build(dict(("tag%s" % i, i) for i in range(10)))
+        assert index.suggest("t") == [("tag9", 9), ("tag8", 8), ("tag7", 7)]
+
+        index.update({"tag1": 10, "tag9": -9})
+        assert index.suggest("t") == [("tag1", 11), ("tag8", 8), ("tag7", 7)]
+
+        index.remove(["tag8"])
+        assert index.suggest("") == [("tag1", 11), ("tag7", 7), ("tag6", 6)]
+        assert index.suggest("ta") == index.suggest("tag")
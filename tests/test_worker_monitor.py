@@ -0,0 +1,91 @@
+import os
+import shutil
+import time
+from unittest import mock
+
+from golink.extensions import db
+from golink.monitor import HEARTBEAT_KEY
+
+from . import GolinkTestCase
+
+
+class HeartbeatStore():
+    """In-memory stand-in for the redis sorted set of worker heartbeats"""
+
+    def __init__(self):
+        self.heartbeats = {}
+
+    def zrangebyscore(self, key, min_score, max_score, withscores=False):
+        assert key == HEARTBEAT_KEY
+        return [(worker.encode(), last_seen) for worker, last_seen in sorted(self.heartbeats.items()) if last_seen >= min_score]
+
+
+class TestWorkerMonitor(GolinkTestCase):
+
+    template_repo = "/golink/test-data/test-repo/"
+    testing_repo = "/repos/myrepo"
+    public_file = "/repos/myrepo/my_file_to_publish.txt"
+
+    def setup_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        shutil.copytree(self.template_repo, self.testing_repo)
+
+    def teardown_method(self):
+        if os.path.exists(self.testing_repo):
+            shutil.rmtree(self.testing_repo)
+        db.session.remove()
+        db.drop_all()
+
+    def seed_monitor(self, client):
+        monitor = client.application.worker_monitor
+        monitor.redis = HeartbeatStore()
+        # Read the heartbeats on each request
+        monitor.cache_ttl = 0
+        return monitor
+
+    def get_health(self, app, client):
+        token = self.create_mock_token(app, user="adminuser")
+        response = client.get("/api/admin/health", headers={'X-Auth-Token': 'Bearer ' + token})
+        assert response.status_code == 200
+        return response.json
+
+    def publish(self, app, client):
+        token = self.create_mock_token(app)
+        return client.post('/api/publish', json={'path': self.public_file}, headers={'X-Auth-Token': 'Bearer ' + token})
+
+    def test_health_heartbeats(self, app, client):
+        monitor = self.seed_monitor(client)
+
+        assert self.get_health(app, client)['celery_available'] is False
+
+        monitor.redis.heartbeats["celery@worker1"] = time.time()
+        data = self.get_health(app, client)
+        assert data['celery_available'] is True
+        assert list(data['workers']) == ["celery@worker1"]
+
+        # No heartbeat for longer than WORKER_HEARTBEAT_TIMEOUT
+        monitor.redis.heartbeats["celery@worker1"] = time.time() - monitor.timeout - 1
+        data = self.get_health(app, client)
+        assert data['celery_available'] is False
+        assert data['workers'] == {}
+
+    def test_publish_heartbeats(self, app, client):
+        monitor = self.seed_monitor(client)
+        celery = client.application.celery
+
+        with mock.patch.object(celery.control, "inspect", side_effect=AssertionError("inspect called")) as inspect, \
+                mock.patch.object(celery, "send_task") as send_task:
+            monitor.redis.heartbeats["celery@worker1"] = time.time() - monitor.timeout - 1
+            response = self.publish(app, client)
+            assert response.status_code == 400
+            assert response.json == {'error': 'No Celery worker available to process the request'}
+            send_task.assert_not_called()
+
+            monitor.redis.heartbeats["celery@worker1"] = time.time()
+            response = self.publish(app, client)
+            assert response.status_code == 200
+            assert send_task.call_args[0][0] == "publish"
+            assert send_task.call_args[0][1][0] == response.json['file_id']
+
+        inspect.assert_not_called()